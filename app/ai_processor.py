@@ -1,13 +1,50 @@
 from __future__ import annotations
+import asyncio
+import base64
+import gzip
+import hashlib
 import json
 import os
-from dataclasses import dataclass
+import re
+import threading
+from io import BytesIO
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List
-
-import requests  # ✅ pip install requests 필요
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
 
 from app.drive_manager import DriveImage
+from app.llm_cache import LLMCache, make_cache_key
+from app.prompt_registry import PromptRegistry, compact_json
+from app.rate_limiter import AdaptiveRateLimiter
+
+if TYPE_CHECKING:
+    import requests  # ✅ pip install requests 필요 (실제 import는 첫 HTTP 호출 때)
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com"
+IMAGE_MIME_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
+B64_READ_CHUNK = 3 * 256 * 1024  # 3의 배수로 읽어야 청크별 base64를 이어 붙여도 유효
+GZIP_MIN_BYTES = 1024  # 이보다 작은 요청 본문은 압축 이득이 없음
+IMAGE_TOKEN_ESTIMATE = 258  # Gemini 이미지 1장당 입력 토큰(대략)
+RESIZE_MANIFEST_NAME = "manifest.json"  # image_resizer 결과 디렉토리 표식(PIL을 import하지 않으려고 이름만 맞춤)
+RESIZE_KEY_RE = re.compile(r"[0-9a-f]{64}")  # 결과 디렉토리명 = sha256(원본 내용 + 리사이즈 설정)
+CONTINUE_PROMPT = "Continue exactly where you stopped. Do not repeat any text you already wrote."
+
+# fused 모드 응답 스키마: 캡션 + 최종 글을 한 번에
+FUSED_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "images": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {"index": {"type": "INTEGER"}, "summary": {"type": "STRING"}},
+                "required": ["index", "summary"],
+            },
+        },
+        "post_markdown": {"type": "STRING"},
+    },
+    "required": ["images", "post_markdown"],
+}
 
 
 @dataclass
@@ -18,12 +55,177 @@ class AIProcessor:
     api_key: str | None
     prompts_dir: Path
     mock_mode: bool = False
+    files_api_threshold_bytes: int = 15 * 1024 * 1024  # 이미지 합계가 이보다 크면 Files API 업로드(inline 한도 20MB)
+
+    # ✅ HTTP: keep-alive 세션 하나를 모든 Gemini 호출이 공유
+    http_pool_size: int = 4
+    http_timeout: float = 120.0
+    http_retries: int = 2  # 전송 계층의 연결 실패 재시도(429/5xx는 rate_limiter가 처리)
+    gzip_requests: bool = False  # 요청 본문 gzip(Content-Encoding) 전송
+    _session: Optional[requests.Session] = field(default=None, init=False, repr=False)
+    _session_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)  # 여러 AI 워커 스레드가 동시에 처음 호출해도 1개만 생성
+
+    # ✅ 응답 캐시: 같은 입력으로 재실행하면 API 호출 없이 완료(bypass=True면 읽기만 건너뜀)
+    cache: Optional[LLMCache] = None
+    cache_bypass: bool = False
+
+    # ✅ 동시성/쿼터: async API의 동시 호출 수 + 공통 재시도/쿼터 계층(모든 Gemini 호출에 적용)
+    max_concurrency: int = 2
+    rate_limiter: AdaptiveRateLimiter = field(default_factory=AdaptiveRateLimiter)
+    _semaphore: Optional[asyncio.Semaphore] = field(default=None, init=False, repr=False)
+    _semaphore_loop: Any = field(default=None, init=False, repr=False)
+
+    # ✅ 글 생성은 streamGenerateContent로 받고, 잘리면(MAX_TOKENS) 이어쓰기 요청
+    streaming: bool = False
+    max_continuations: int = 1
+
+    # ✅ fused: 이미지 → 캡션 + 최종 글을 멀티모달 1회 호출로(검증 실패 시 기존 2단계로 자동 전환)
+    fused_mode: bool = False
+
+    # ✅ 프롬프트 템플릿은 레지스트리에서(메모리 캐시 + mtime 무효화), 호출별 토큰 사용량(usageMetadata) 기록
+    prompts: Optional[PromptRegistry] = None
+    usage: List[Dict[str, Any]] = field(default_factory=list, init=False, repr=False)
+
+    def _http(self) -> requests.Session:
+        if self._session is not None:
+            return self._session
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                # 요청이 서버에 닿기 전 연결 실패만 여기서 재시도, 응답 상태 기반 재시도는 rate_limiter 한 곳에서
+                retry = Retry(
+                    total=self.http_retries,
+                    connect=self.http_retries,
+                    read=0,
+                    status=0,
+                    backoff_factor=0.5,
+                    raise_on_status=False,
+                )
+                pool_size = max(self.http_pool_size, self.max_concurrency)  # 동시 호출 수만큼은 연결 유지
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.headers.update({"Accept-Encoding": "gzip, deflate"})  # 응답 gzip은 requests가 자동 해제
+                self._session = session
+            return self._session
+
+    def _post(
+        self,
+        url: str,
+        *,
+        payload: Any = None,
+        data: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        est_tokens: Optional[int] = None,
+        stream: bool = False,
+    ) -> requests.Response:
+        # 모든 호출이 rate_limiter(재시도/Retry-After/AIMD/회로 차단)를 거친다
+        # est_tokens가 있으면 generateContent 호출로 보고 RPM/TPM 쿼터도 차감
+        headers = dict(headers or {})
+        if payload is not None:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        if self.gzip_requests and isinstance(data, (bytes, BytesIO)):
+            raw = data.getbuffer() if isinstance(data, BytesIO) else memoryview(data)  # 본문 복사 없이 압축
+            with raw:
+                if len(raw) >= GZIP_MIN_BYTES:
+                    data = gzip.compress(raw, compresslevel=5)
+                    headers["Content-Encoding"] = "gzip"
+
+        def send() -> requests.Response:
+            if hasattr(data, "seek"):
+                data.seek(0)  # 파일 스트림 본문은 재시도 때 처음부터
+            return self._http().post(
+                url, params=params, data=data, headers=headers, timeout=timeout or self.http_timeout, stream=stream
+            )
+
+        return self.rate_limiter.call(send, tokens=est_tokens or 0, use_quota=est_tokens is not None)
+
+    def rate_stats(self) -> Dict[str, Any]:
+        """이번 실행의 요청/429/재시도/대기 시간 카운터"""
+        return dict(self.rate_limiter.stats.as_dict(), current_rpm=round(self.rate_limiter.rpm, 2))
+
+    def _image_hash(self, p: Path) -> str:
+        # 리사이즈 결과는 디렉토리명이 이미 내용 해시(원본 sha256 + 설정) → 파일을 다시 읽지 않음
+        if RESIZE_KEY_RE.fullmatch(p.parent.name) and (p.parent / RESIZE_MANIFEST_NAME).exists():
+            return f"resized:{p.parent.name}:{p.name}"
+        h = hashlib.sha256()  # 리사이즈가 실패해 원본을 보내는 경우만 직접 해시
+        with p.open("rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def _cache_key(self, model: str, generation_config: Dict[str, Any], prompt: str, paths: List[Path] = ()) -> str:
+        image_hashes = [self._image_hash(p) for p in paths]
+        return make_cache_key(self.provider.lower(), model, generation_config, prompt, image_hashes)
+
+    def _cache_get(self, key: str) -> Optional[str]:
+        if self.cache is None or self.cache_bypass:
+            return None
+        hit = self.cache.get(key)
+        if hit is not None:
+            print(f"[CACHE] LLM response cache hit ({key[:12]})")
+        return hit
+
+    def _cache_put(self, key: str, value: str) -> None:
+        if self.cache is None:
+            return
+        try:
+            self.cache.put(key, value)
+        except OSError as e:
+            print(f"[WARN] Failed to write LLM cache: {e}")
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
 
     def _read_prompt(self, filename: str) -> str:
-        path = self.prompts_dir / filename
-        if not path.exists():
-            raise FileNotFoundError(f"Missing prompt file: {path}")
-        return path.read_text(encoding="utf-8")
+        if self.prompts is None:
+            self.prompts = PromptRegistry(self.prompts_dir)
+        return self.prompts.get(filename)
+
+    def _record_usage(self, label: str, model: str, data: Dict[str, Any]) -> None:
+        meta = data.get("usageMetadata") or {}
+        if not meta:
+            return
+        entry = {
+            "call": label,
+            "model": model,
+            "prompt_tokens": int(meta.get("promptTokenCount", 0)),
+            "output_tokens": int(meta.get("candidatesTokenCount", 0)),
+            "total_tokens": int(meta.get("totalTokenCount", 0)),
+        }
+        self.usage.append(entry)
+        print(f"[TOKENS] {label} ({model}): prompt={entry['prompt_tokens']} output={entry['output_tokens']} total={entry['total_tokens']}")
+
+    def usage_summary(self) -> Dict[str, Dict[str, int]]:
+        """이번 실행의 호출 종류별 토큰 합계 (프롬프트 비대화 측정용)"""
+        summary: Dict[str, Dict[str, int]] = {}
+        for u in self.usage:
+            s = summary.setdefault(u["call"], {"calls": 0, "prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0})
+            s["calls"] += 1
+            for k in ("prompt_tokens", "output_tokens", "total_tokens"):
+                s[k] += u[k]
+        return summary
+
+    def count_tokens(self, prompt: str, model: Optional[str] = None) -> int:
+        """countTokens로 프롬프트 토큰 수만 측정(생성 없음, 쿼터 차감 없음)"""
+        model = model or self.text_model
+        r = self._post(
+            f"{GEMINI_BASE_URL}/v1beta/models/{model}:countTokens",
+            params={"key": self.api_key},
+            payload={"contents": [{"role": "user", "parts": [{"text": prompt}]}]},
+            timeout=30,
+        )
+        if r.status_code != 200:
+            raise RuntimeError(f"Gemini countTokens error: {r.status_code} {r.text[:300]}")
+        return int(r.json().get("totalTokens", 0))
 
     # -----------------------------
     # ✅ 더미 생성 로직
@@ -57,8 +259,9 @@ class AIProcessor:
     # ✅ 실모드: DriveImage에서 로컬 파일 경로 뽑기(필드명 달라도 안전)
     # -----------------------------
     def _get_local_path(self, img: DriveImage) -> Path:
+        # ✅ 리사이즈 결과가 있으면 그걸 보냄(원본 대비 업로드 바이트 대폭 감소)
         # DriveImage가 local_path / path / local_file 같은 이름 중 뭐든 쓸 수 있게 방어
-        for key in ("local_path", "path", "local_file", "download_path"):
+        for key in ("resized_path", "local_path", "path", "local_file", "download_path"):
             v = getattr(img, key, None)
             if v:
                 return Path(v)
@@ -67,56 +270,70 @@ class AIProcessor:
     # -----------------------------
     # ✅ 실모드: Gemini 호출 (텍스트)
     # -----------------------------
-    def _gemini_generate_text(self, prompt: str, temperature: float = 0.6, max_tokens: int = 1200) -> str:
+    def _iter_stream_chunks(self, r: requests.Response):
+        # streamGenerateContent?alt=sse: "data: {...}" 줄마다 GenerateContentResponse 1개
+        for line in r.iter_lines(decode_unicode=True):
+            if line and line.startswith("data:"):
+                yield json.loads(line[5:].strip())
+
+    def _generate_once(self, payload: Dict[str, Any], est_tokens: int, label: str = "text") -> tuple:
+        """generateContent 1회(streaming이면 streamGenerateContent). (텍스트, finishReason, 마지막 응답) 반환"""
+        method = "streamGenerateContent" if self.streaming else "generateContent"
+        url = f"{GEMINI_BASE_URL}/v1beta/models/{self.text_model}:{method}"
+        params = {"key": self.api_key}
+        if self.streaming:
+            params["alt"] = "sse"
+
+        r = self._post(url, params=params, payload=payload, timeout=90, est_tokens=est_tokens, stream=self.streaming)
+        with r:
+            # HTTP 에러 처리
+            if r.status_code != 200:
+                raise RuntimeError(f"Gemini API error: {r.status_code} {r.text}")
+
+            chunks = self._iter_stream_chunks(r) if self.streaming else [r.json()]
+            texts: List[str] = []
+            finish = None
+            data: Dict[str, Any] = {}
+            for data in chunks:
+                # ✅ 텍스트 안전 추출 (스트리밍이면 도착하는 대로 이어 붙임)
+                cands = data.get("candidates") or []
+                cand0 = cands[0] if cands else {}
+                for part in (cand0.get("content") or {}).get("parts") or []:
+                    if isinstance(part, dict) and part.get("text"):
+                        texts.append(part["text"])
+                finish = cand0.get("finishReason") or finish
+
+        self._record_usage(label, self.text_model, data)  # 스트리밍이면 마지막 청크에 usageMetadata
+        sep = "" if self.streaming else "\n"  # 스트림 청크는 문장 중간에서 끊겨 온다
+        return sep.join(texts), finish, data
+
+    def _gemini_generate_text(self, prompt: str, temperature: float = 0.6, max_tokens: int = 1200, label: str = "text") -> str:
         if not self.api_key:
             raise ValueError("Missing API key: set GEMINI_API_KEY (or set ai.mock_mode=true)")
 
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.text_model}:generateContent"
-        params = {"key": self.api_key}
         payload = {
             "contents": [{"role": "user", "parts": [{"text": prompt}]}],
             "generationConfig": {
-                "temperature": 0.1,
-                "maxOutputTokens": 1200,
+                "temperature": temperature,
+                "maxOutputTokens": max_tokens,
             },
         }
+        cache_key = self._cache_key(self.text_model, payload["generationConfig"], prompt)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        est_tokens = len(prompt) // 3 + payload["generationConfig"]["maxOutputTokens"]
 
         import time, random
 
-        # ✅ 429 / 이상응답(MAX_TOKENS + parts없음) 자동 재시도
+        # ✅ 이상응답(MAX_TOKENS + parts없음) 자동 재시도 (429/5xx는 _post의 rate_limiter가 처리)
         for attempt in range(4):  # 최대 4번
-            r = requests.post(url, params=params, json=payload, timeout=90)
-
-            # HTTP 에러 처리
-            if r.status_code == 429:
-                wait = (1.2 * (2 ** attempt)) + random.uniform(0.0, 0.8)
-                print(f"[WARN] Gemini 429. retry in {wait:.1f}s...")
-                time.sleep(wait)
-                continue
-
-            if r.status_code != 200:
-                raise RuntimeError(f"Gemini API error: {r.status_code} {r.text}")
-
-            data = r.json()
-
-            # ✅ 텍스트 안전 추출
-            cands = data.get("candidates") or []
-            cand0 = cands[0] if cands else {}
-            content = (cand0.get("content") or {})
-            parts = content.get("parts") or []
-
-            texts = []
-            for p in parts:
-                if isinstance(p, dict) and p.get("text"):
-                    texts.append(p["text"])
-
-            if texts:
-                return "\n".join(texts).strip()
+            text, finish, data = self._generate_once(payload, est_tokens, label)
+            if text:
+                break
 
             # ✅ 여기로 오면: parts가 없거나 text가 없음
             # 로그에 네가 본 케이스: finishReason=MAX_TOKENS, content.parts 없음
-            finish = cand0.get("finishReason")
-
             # MAX_TOKENS면서 텍스트가 비어있으면 -> 잠깐 쉬고 재시도
             if finish == "MAX_TOKENS":
                 wait = (1.0 * (2 ** attempt)) + random.uniform(0.0, 0.6)
@@ -126,8 +343,99 @@ class AIProcessor:
 
             # 그 외는 그냥 에러로 보여주기
             raise RuntimeError(f"Unexpected Gemini response: {json.dumps(data, ensure_ascii=False)[:800]}")
+        else:
+            raise RuntimeError("Gemini text generation failed after retries (MAX_TOKENS/no parts)")
+
+        # ✅ 잘린 출력(MAX_TOKENS)은 버리지 않고, 지금까지의 글을 model 턴으로 넣어 이어쓰기 요청
+        pieces = [text]
+        for _ in range(self.max_continuations):
+            if finish != "MAX_TOKENS":
+                break
+            partial = "".join(pieces)
+            print(f"[INFO] Output truncated at {len(partial)} chars (MAX_TOKENS). requesting continuation...")
+            cont_payload = dict(payload, contents=[
+                payload["contents"][0],
+                {"role": "model", "parts": [{"text": partial}]},
+                {"role": "user", "parts": [{"text": CONTINUE_PROMPT}]},
+            ])
+            more, finish, _ = self._generate_once(cont_payload, est_tokens + len(partial) // 3, f"{label}:continue")
+            if not more:
+                break
+            pieces.append(more)
+        result = "".join(pieces).strip()
+        if finish == "MAX_TOKENS":
+            # 잘린 글은 이번 실행에만 쓰고 캐시하지 않음(재실행 때 TTL 내내 잘린 글이 재사용되지 않게)
+            print("[WARN] Output still truncated after continuations; keeping partial text (not cached)")
+        else:
+            self._cache_put(cache_key, result)
+        return result
 
-        raise RuntimeError("Gemini text generation failed after retries (429/MAX_TOKENS/no parts)")
+    # -----------------------------
+    # ✅ 실모드: 이미지 요청 본문 만들기 (파일당 1회 읽기)
+    # -----------------------------
+    def _image_mime(self, p: Path) -> str:
+        return IMAGE_MIME_TYPES.get(p.suffix.lower(), "image/jpeg")
+
+    def _upload_to_files_api(self, p: Path) -> Dict[str, str]:
+        # Files API resumable 업로드: 시작 요청으로 업로드 URL을 받고, 파일 핸들을 그대로 스트리밍
+        mime = self._image_mime(p)
+        size = p.stat().st_size
+        start = self._post(
+            f"{GEMINI_BASE_URL}/upload/v1beta/files",
+            params={"key": self.api_key},
+            headers={
+                "X-Goog-Upload-Protocol": "resumable",
+                "X-Goog-Upload-Command": "start",
+                "X-Goog-Upload-Header-Content-Length": str(size),
+                "X-Goog-Upload-Header-Content-Type": mime,
+            },
+            payload={"file": {"display_name": p.name}},
+            timeout=60,
+        )
+        upload_url = start.headers.get("x-goog-upload-url")
+        if start.status_code != 200 or not upload_url:
+            raise RuntimeError(f"Gemini Files API start failed: {start.status_code} {start.text[:300]}")
+
+        with p.open("rb") as f:
+            r = self._post(
+                upload_url,
+                headers={
+                    "Content-Length": str(size),
+                    "X-Goog-Upload-Offset": "0",
+                    "X-Goog-Upload-Command": "upload, finalize",
+                },
+                data=f,
+                timeout=300,
+            )
+        if r.status_code != 200:
+            raise RuntimeError(f"Gemini Files API upload failed: {r.status_code} {r.text[:300]}")
+        info = r.json().get("file") or {}
+        return {"mime_type": info.get("mimeType", mime), "file_uri": info["uri"]}
+
+    def _build_captions_body(self, prompt: str, paths: List[Path], generation_config: Dict[str, Any]) -> Union[bytes, BytesIO]:
+        suffix = json.dumps({"generationConfig": generation_config}, ensure_ascii=False)[1:]  # '"generationConfig": ...}'
+
+        # 큰 배치는 Files API로 올리고 URI만 참조
+        if sum(p.stat().st_size for p in paths) > self.files_api_threshold_bytes:
+            parts: List[Dict[str, Any]] = [{"text": prompt}]
+            parts += [{"file_data": self._upload_to_files_api(p)} for p in paths]
+            payload = {"contents": [{"role": "user", "parts": parts}], "generationConfig": generation_config}
+            return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+        # inline: JSON 본문을 직접 써 내려가며 각 파일을 청크 단위로 읽어 base64로 바로 기록
+        buf = BytesIO()
+        buf.write(b'{"contents":[{"role":"user","parts":[')
+        buf.write(json.dumps({"text": prompt}, ensure_ascii=False).encode("utf-8"))
+        for p in paths:
+            buf.write(f',{{"inline_data":{{"mime_type":"{self._image_mime(p)}","data":"'.encode("ascii"))
+            with p.open("rb") as f:
+                for chunk in iter(lambda: f.read(B64_READ_CHUNK), b""):
+                    buf.write(base64.b64encode(chunk))
+            buf.write(b'"}}')
+        buf.write(b"]}],")
+        buf.write(suffix.encode("utf-8"))
+        buf.seek(0)
+        return buf  # getvalue() 복사 없이 버퍼를 그대로 전송(재시도 때는 _post가 처음으로 되감음)
 
     # -----------------------------
     # ✅ 실모드: Gemini 호출 (이미지 + 텍스트 → 캡션 JSON)
@@ -137,62 +445,117 @@ class AIProcessor:
             raise ValueError("Missing API key: set GEMINI_API_KEY (or set ai.mock_mode=true)")
 
         prompt = self._read_prompt("photo_captions.txt")
+        paths = [self._get_local_path(img) for img in images[:4]]  # 최대 4장
+        generation_config = {
+            "temperature": 0.1,
+            "maxOutputTokens": 2000,
+        }
+        cache_key = self._cache_key(self.vision_model, generation_config, prompt, paths)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return json.loads(cached)
 
-        parts: List[Dict[str, Any]] = [{"text": prompt}]
+        body = self._build_captions_body(prompt, paths, generation_config)
 
-        # 최대 4장
-        for img in images[:4]:
-            p = self._get_local_path(img)
-            b = p.read_bytes()
+        url = f"{GEMINI_BASE_URL}/v1beta/models/{self.vision_model}:generateContent"
+        params = {"key": self.api_key}
+        est_tokens = len(prompt) // 3 + IMAGE_TOKEN_ESTIMATE * len(paths) + generation_config["maxOutputTokens"]
+        r = self._post(url, params=params, data=body, headers={"Content-Type": "application/json"}, est_tokens=est_tokens)
+        if r.status_code != 200:
+            raise RuntimeError(f"Gemini API error: {r.status_code} {r.text}")
 
-            mime = "image/jpeg" if p.suffix.lower() in (".jpg", ".jpeg") else "image/png"
-            parts.append(
-                {
-                    "inline_data": {
-                        "mime_type": mime,
-                        "data": b.hex(),  # ❌ 이건 안됨 (바로 아래에서 base64로 바꿈)
-                    }
-                }
-            )
+        data = r.json()
+        self._record_usage("captions", self.vision_model, data)
+        try:
+            text = data["candidates"][0]["content"]["parts"][0]["text"]
+        except Exception:
+            raise RuntimeError(f"Unexpected Gemini response: {json.dumps(data, ensure_ascii=False)[:800]}")
 
-        # 위에서 hex로 넣으면 안 되니까 base64로 교체
-        # (parts를 다시 만들어서 넣는 방식으로 안전 처리)
-        import base64
-        fixed_parts: List[Dict[str, Any]] = [{"text": prompt}]
-        for img in images[:4]:
-            p = self._get_local_path(img)
-            b64 = base64.b64encode(p.read_bytes()).decode("utf-8")
-            mime = "image/jpeg" if p.suffix.lower() in (".jpg", ".jpeg") else "image/png"
-            fixed_parts.append(
-                {"inline_data": {"mime_type": mime, "data": b64}}
-            )
+        cleaned = text.strip().replace("```json", "").replace("```", "").strip()
 
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.vision_model}:generateContent"
-        params = {"key": self.api_key}
-        payload = {
-            "contents": [{"role": "user", "parts": fixed_parts}],
-            "generationConfig": {
-                "temperature": 0.1,
-                "maxOutputTokens": 2000,
-            },
+        try:
+            captions = json.loads(cleaned)
+        except Exception:
+            raise RuntimeError(f"Captions JSON parse failed. Raw={cleaned[:800]}")
+        self._cache_put(cache_key, cleaned)
+        return captions
+
+    # -----------------------------
+    # ✅ 실모드: 이미지 + 텍스트 → 캡션 + 최종 글 (1회 호출, JSON 스키마)
+    # -----------------------------
+    def _validate_fused(self, result: Any, n_images: int) -> tuple[Dict[str, Any], str]:
+        """fused 응답 검증. 어떤 형태로 어긋나도 ValueError로 통일해 2단계 모드로 전환되게 한다"""
+        try:
+            return self._check_fused(result, n_images)
+        except (TypeError, KeyError, AttributeError) as e:  # null index, 키 누락 등 잘못된 JSON 구조
+            raise ValueError(f"malformed fused response: {type(e).__name__}: {e}") from e
+
+    def _check_fused(self, result: Any, n_images: int) -> tuple[Dict[str, Any], str]:
+        if not isinstance(result, dict):
+            raise ValueError("fused response is not a JSON object")
+        items = result.get("images")
+        post = result.get("post_markdown")
+        if not isinstance(items, list) or len(items) != n_images:
+            raise ValueError(f"expected {n_images} image summaries, got {len(items) if isinstance(items, list) else 0}")
+        if not all(isinstance(it, dict) and isinstance(it.get("summary"), str) for it in items):
+            raise ValueError("each image summary must be an object with a string summary")
+        if sorted(int(it["index"]) for it in items) != list(range(1, n_images + 1)):
+            raise ValueError("image indexes must be 1..N")
+        if not isinstance(post, str) or not post.strip():
+            raise ValueError("post_markdown is empty")
+        missing = [i for i in range(1, n_images + 1) if f"[[IMAGE_{i}]]" not in post]
+        if missing:
+            raise ValueError(f"post_markdown is missing image placeholders {missing}")
+        return {"images": sorted(items, key=lambda it: int(it["index"]))}, post.strip()
+
+    def _gemini_generate_fused(self, images: List[DriveImage], notepad: str = "") -> tuple[Dict[str, Any], str]:
+        if not self.api_key:
+            raise ValueError("Missing API key: set GEMINI_API_KEY (or set ai.mock_mode=true)")
+
+        paths = [self._get_local_path(img) for img in images[:4]]  # 최대 4장
+        input_data_str = compact_json({"additional_info": notepad.strip() if notepad else ""})
+        prompt = (
+            f"{self._read_prompt('post_fused.txt')}\n\n"
+            f"### 작성 규칙:\n{self._read_prompt('post_writer.txt')}\n\n"
+            f"### INPUT DATA (JSON):\n{input_data_str}\n\n"
+            f"---"
+        )
+        generation_config = {
+            "temperature": 0.3,
+            "maxOutputTokens": 4096,
+            "responseMimeType": "application/json",
+            "responseSchema": FUSED_RESPONSE_SCHEMA,
         }
+        cache_key = self._cache_key(self.vision_model, generation_config, prompt, paths)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return self._validate_fused(json.loads(cached), len(paths))
 
-        r = requests.post(url, params=params, json=payload, timeout=120)
+        body = self._build_captions_body(prompt, paths, generation_config)
+
+        url = f"{GEMINI_BASE_URL}/v1beta/models/{self.vision_model}:generateContent"
+        params = {"key": self.api_key}
+        est_tokens = len(prompt) // 3 + IMAGE_TOKEN_ESTIMATE * len(paths) + generation_config["maxOutputTokens"]
+        r = self._post(url, params=params, data=body, headers={"Content-Type": "application/json"}, est_tokens=est_tokens)
         if r.status_code != 200:
             raise RuntimeError(f"Gemini API error: {r.status_code} {r.text}")
 
         data = r.json()
+        self._record_usage("fused", self.vision_model, data)
         try:
-            text = data["candidates"][0]["content"]["parts"][0]["text"]
+            text = "".join(p.get("text", "") for p in data["candidates"][0]["content"]["parts"])
         except Exception:
             raise RuntimeError(f"Unexpected Gemini response: {json.dumps(data, ensure_ascii=False)[:800]}")
 
         cleaned = text.strip().replace("```json", "").replace("```", "").strip()
-
         try:
-            return json.loads(cleaned)
+            result = json.loads(cleaned)
         except Exception:
-            raise RuntimeError(f"Captions JSON parse failed. Raw={cleaned[:800]}")
+            raise ValueError(f"Fused JSON parse failed. Raw={cleaned[:300]}")
+
+        captions, post_text = self._validate_fused(result, len(paths))
+        self._cache_put(cache_key, json.dumps(result, ensure_ascii=False))
+        return captions, post_text
 
     # -----------------------------
     # ✅ 외부에서 쓰는 메인 함수 2개
@@ -212,8 +575,7 @@ class AIProcessor:
         return self._gemini_generate_captions_json(images)
 
     def generate_post_markdown(self, captions: Dict[str, Any], notepad: str = "") -> str:
-        import time
-        time.sleep(2) 
+        # 호출 간격은 rate_limiter(RPM/TPM)가 관리 (고정 sleep 없음)
         # 1. 테스트 모드 대응
         if self.mock_mode:
             return self._mock_post(captions)
@@ -225,12 +587,12 @@ class AIProcessor:
         # 3. 프롬프트 파일 읽기 (수정하기 쉽게 외부로 빼둔 파일)
         writer_prompt = self._read_prompt("post_writer.txt")
         
-        # 4. 입력 데이터 구조화 (JSON으로 묶어서 보내야 토큰이 절약되고 AI가 잘 알아듣습니다)
+        # 4. 입력 데이터 구조화 (JSON으로 묶어서 보내야 토큰이 절약되고 AI가 잘 알아듣습니다, 공백 없는 compact JSON)
         user_payload = {
             "captions": captions,
             "additional_info": notepad.strip() if notepad else ""
         }
-        input_data_str = json.dumps(user_payload, ensure_ascii=False, indent=2)
+        input_data_str = compact_json(user_payload)
 
         # 5. 최종 프롬프트 구성 (아주 깔끔해졌죠?)
         # 지시사항(파일 내용) + 실제 데이터(JSON)
@@ -241,7 +603,22 @@ class AIProcessor:
         )
 
         # 6. 실행 및 결과 반환
-        return self._gemini_generate_text(final_prompt, temperature=0.6, max_tokens=500).strip()
+        return self._gemini_generate_text(final_prompt, temperature=0.6, max_tokens=1200, label="post").strip()
+
+    def generate_captions_and_post(self, images: List[DriveImage], notepad: str = "") -> tuple[Dict[str, Any], str]:
+        """캡션 + 글 생성. fused_mode면 1회 호출, 실패/검증 실패면 캡션 → 글 2단계로 자동 전환"""
+        if not images:
+            raise ValueError("generate_captions_and_post: images is empty")
+        images = images[:4]
+
+        if self.fused_mode and not self.mock_mode and self.provider.lower() == "gemini":
+            try:
+                return self._gemini_generate_fused(images, notepad)
+            except (RuntimeError, ValueError) as e:
+                print(f"[WARN] Fused caption+post call failed, falling back to multi-step: {str(e)[:300]}")
+
+        captions = self.generate_photo_captions(images)
+        return captions, self.generate_post_markdown(captions, notepad)
 
     def rewrite_trendy_blog(self, draft_post: str, style_note: str = "") -> str:
         """
@@ -267,11 +644,35 @@ class AIProcessor:
 
         final_prompt = (
             f"{rewrite_prompt}\n\n"
-            f"### INPUT (JSON):\n{json.dumps(payload, ensure_ascii=False, indent=2)}\n\n"
+            f"### INPUT (JSON):\n{compact_json(payload)}\n\n"
             f"---"
         )
 
-        return self._gemini_generate_text(final_prompt, temperature=0.7, max_tokens=1500).strip()
+        return self._gemini_generate_text(final_prompt, temperature=0.7, max_tokens=1500, label="rewrite").strip()
+
+    # -----------------------------
+    # ✅ async API: 이벤트 루프 안에서 쓰는 호출자용 (동시 호출 수는 세마포어, 쿼터는 rate_limiter)
+    #    파이프라인 drain은 StageExecutor의 ai 단계 스레드(pipeline.stages.ai.workers)로 동시 처리한다
+    # -----------------------------
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def agenerate_photo_captions(self, images: List[DriveImage]) -> Dict[str, Any]:
+        async with self._get_semaphore():
+            return await asyncio.to_thread(self.generate_photo_captions, images)
+
+    async def agenerate_post_markdown(self, captions: Dict[str, Any], notepad: str = "") -> str:
+        async with self._get_semaphore():
+            return await asyncio.to_thread(self.generate_post_markdown, captions, notepad)
+
+    async def agenerate_captions_for_batches(self, batches: List[List[DriveImage]]) -> List[Dict[str, Any]]:
+        """배치(최대 4장씩) 여러 개의 캡션을 동시에 생성. 결과는 입력 순서"""
+        return list(await asyncio.gather(*(self.agenerate_photo_captions(b) for b in batches)))
+
 
 def create_ai_processor(config: Dict[str, Any]) -> AIProcessor:
     ai_cfg = config.get("ai", {})
@@ -279,9 +680,40 @@ def create_ai_processor(config: Dict[str, Any]) -> AIProcessor:
     vision_model = ai_cfg.get("vision_model", "gemini-1.5-pro-vision")
     text_model = ai_cfg.get("text_model", "gemini-2.0-flash")
     mock_mode = bool(ai_cfg.get("mock_mode", False))
+    files_api_threshold_mb = float(ai_cfg.get("files_api_threshold_mb", 15))
+    http_cfg = ai_cfg.get("http", {})
+    cache_cfg = ai_cfg.get("cache", {})
 
     base_dir = Path(__file__).resolve().parent.parent
     prompts_dir = base_dir / "prompts"
+    prompts = PromptRegistry(prompts_dir)
+    if not mock_mode:
+        # 실모드에서만 쓰는 템플릿은 시작 시 한 번 읽고 검증
+        prompts.preload("photo_captions.txt", "post_writer.txt", "post_rewriter_trendy.txt")
+        if ai_cfg.get("fused_mode", False):
+            prompts.preload("post_fused.txt")
+
+    # ✅ 응답 캐시(enabled=false면 사용 안 함, AI_CACHE_BYPASS=1이면 이번 실행만 읽기 건너뜀)
+    cache = None
+    if cache_cfg.get("enabled", True):
+        cache_dir = base_dir / config.get("project", {}).get("cache_dir", ".cache") / "llm"
+        cache = LLMCache(
+            root=cache_dir,
+            ttl_seconds=float(cache_cfg.get("ttl_hours", 168)) * 3600,
+            max_bytes=int(float(cache_cfg.get("max_mb", 50)) * 1024 * 1024),
+        )
+    cache_bypass = bool(cache_cfg.get("bypass", False)) or os.getenv("AI_CACHE_BYPASS", "") not in ("", "0")
+
+    rate_cfg = ai_cfg.get("rate_limit", {})
+    rate_limiter = AdaptiveRateLimiter(
+        rpm=float(rate_cfg.get("rpm", 10)),
+        tpm=float(rate_cfg.get("tpm", 250_000)),
+        min_rpm=float(rate_cfg.get("min_rpm", 1)),
+        max_attempts=int(rate_cfg.get("max_attempts", 5)),
+        max_backoff=float(rate_cfg.get("max_backoff_seconds", 60)),
+        failure_threshold=int(rate_cfg.get("failure_threshold", 5)),
+        cooldown_seconds=float(rate_cfg.get("cooldown_seconds", 120)),
+    )
 
     api_key = None
     if not mock_mode:
@@ -296,4 +728,17 @@ def create_ai_processor(config: Dict[str, Any]) -> AIProcessor:
         api_key=api_key,
         prompts_dir=prompts_dir,
         mock_mode=mock_mode,
+        files_api_threshold_bytes=int(files_api_threshold_mb * 1024 * 1024),
+        http_pool_size=int(http_cfg.get("pool_size", 4)),
+        http_timeout=float(http_cfg.get("timeout", 120)),
+        http_retries=int(http_cfg.get("retries", 2)),
+        gzip_requests=bool(http_cfg.get("gzip_requests", False)),
+        cache=cache,
+        cache_bypass=cache_bypass,
+        max_concurrency=int(ai_cfg.get("max_concurrency", 2)),
+        rate_limiter=rate_limiter,
+        streaming=bool(ai_cfg.get("streaming", False)),
+        max_continuations=int(ai_cfg.get("max_continuations", 1)),
+        fused_mode=bool(ai_cfg.get("fused_mode", False)),
+        prompts=prompts,
     )
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import json
+import os
+import secrets
+import shutil
+import socket
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+CHECKPOINT_NAME = "checkpoint.json"
+FINISHED_STATUSES = ("done", "abandoned")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _age_seconds(ts: Optional[str]) -> float:
+    try:
+        return (datetime.now(timezone.utc) - datetime.fromisoformat(str(ts))).total_seconds()
+    except (TypeError, ValueError):
+        return float("inf")
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":  # Windows의 os.kill(pid, 0)은 신호 확인이 아님 → heartbeat로만 판단
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # 다른 사용자 프로세스
+        return True
+    return True
+
+
+def _owner() -> Dict[str, Any]:
+    return {"pid": os.getpid(), "host": socket.gethostname()}
+
+
+@dataclass
+class RunCheckpoint:
+    """실행 1회의 단계별 결과 (.runs/<run_id>/checkpoint.json)
+
+    단계가 끝날 때마다 결과를 기록해 두고, 실패한 실행은 다음 실행에서 첫 미완료 단계부터 이어간다.
+    """
+
+    path: Path
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def run_id(self) -> str:
+        return self.data.get("run_id", self.path.parent.name)
+
+    @property
+    def mode(self) -> str:
+        return self.data.get("mode", "single")
+
+    @property
+    def done(self) -> bool:
+        return self.data.get("status") == "done"
+
+    @property
+    def finished(self) -> bool:
+        """완료 또는 포기한 실행(더 이상 이어가지 않음)"""
+        return self.data.get("status") in FINISHED_STATUSES
+
+    @property
+    def attempts(self) -> int:
+        return int(self.data.get("attempts", 1))
+
+    def has(self, stage: str) -> bool:
+        return stage in self.data.get("stages", {})
+
+    def get(self, stage: str, default: Any = None) -> Any:
+        return self.data.get("stages", {}).get(stage, default)
+
+    def _write(self) -> None:
+        self.data["updated_at"] = _now()  # heartbeat: 다른 호스트의 실행이 살아 있는지 판단
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        tmp.write_text(json.dumps(self.data, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.path)
+
+    def save(self, stage: str, value: Any) -> None:
+        self.data.setdefault("stages", {})[stage] = value
+        self._write()
+
+    def fail(self, error: str) -> None:
+        self.data["status"] = "failed"
+        self.data["last_error"] = error
+        self._write()
+
+    def complete(self) -> None:
+        self.data["status"] = "done"
+        self._write()
+
+    def abandon(self, reason: str) -> None:
+        self.data["status"] = "abandoned"
+        self.data["abandon_reason"] = reason
+        self._write()
+
+    def claim(self) -> None:
+        """이 프로세스가 이어서 실행함을 기록(시도 횟수 증가)"""
+        self.data.update(_owner(), status="running", attempts=self.attempts + 1)
+        self._write()
+
+
+@dataclass
+class CheckpointStore:
+    root: Path  # repo 루트 기준 .runs (git 추적 제외)
+    keep: int = 20  # 완료된 실행 디렉토리는 최근 N개만 보관
+    max_attempts: int = 3  # 같은 실행을 이만큼 시도해도 실패하면 포기(결정적으로 실패하는 단계가 새 이미지를 막지 않게)
+    max_age_hours: float = 24.0  # 이보다 오래된 미완료 실행은 포기
+    stale_seconds: float = 1800.0  # 다른 호스트의 running 실행은 이 시간 동안 기록이 없으면 죽은 것으로 봄
+
+    def new_run(self, mode: str) -> RunCheckpoint:
+        run_id = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{secrets.token_hex(3)}"
+        cp = RunCheckpoint(
+            path=self.root / run_id / CHECKPOINT_NAME,
+            data={"run_id": run_id, "mode": mode, "status": "running", "created_at": _now(), "attempts": 1, **_owner(), "stages": {}},
+        )
+        cp._write()
+        return cp
+
+    def _all(self) -> List[RunCheckpoint]:
+        runs: List[RunCheckpoint] = []
+        if not self.root.exists():
+            return runs
+        for path in sorted(self.root.glob(f"*/{CHECKPOINT_NAME}")):  # run_id가 시각으로 시작하므로 이름순 = 시간순
+            try:
+                runs.append(RunCheckpoint(path=path, data=json.loads(path.read_text(encoding="utf-8"))))
+            except (OSError, ValueError):
+                continue
+        return runs
+
+    def _owned_by_live_process(self, cp: RunCheckpoint) -> bool:
+        """다른 살아 있는 프로세스가 지금 실행 중인 체크포인트인지 (cron과 watch가 겹쳐도 같은 실행을 이어가지 않게)"""
+        if cp.data.get("status") != "running":
+            return False
+        if cp.data.get("host") == socket.gethostname() and "pid" in cp.data:
+            pid = int(cp.data["pid"])
+            return pid != os.getpid() and _pid_alive(pid)
+        return _age_seconds(cp.data.get("updated_at")) < self.stale_seconds
+
+    def _expired(self, cp: RunCheckpoint) -> Optional[str]:
+        if cp.attempts >= self.max_attempts:
+            return f"gave up after {cp.attempts} attempt(s)"
+        if _age_seconds(cp.data.get("created_at")) > self.max_age_hours * 3600:
+            return f"older than {self.max_age_hours:g}h"
+        return None
+
+    def active_elsewhere(self) -> Optional[RunCheckpoint]:
+        """다른 프로세스가 지금 진행 중인 실행(있으면 새 실행을 시작하지 않음 → 같은 이미지 중복 발행 방지)"""
+        return next((cp for cp in reversed(self._all()) if self._owned_by_live_process(cp)), None)
+
+    def latest_incomplete(self) -> Optional[RunCheckpoint]:
+        """이어갈 수 있는 가장 최근 미완료 실행 (읽기 전용)"""
+        for cp in reversed(self._all()):
+            if not cp.finished and not self._owned_by_live_process(cp) and self._expired(cp) is None:
+                return cp
+        return None
+
+    def claim_incomplete(self) -> Optional[RunCheckpoint]:
+        """시도 횟수/기간을 넘긴 실행은 abandoned로 표시하고, 이어갈 가장 최근 실행을 이 프로세스 소유로 표시해 반환"""
+        for cp in reversed(self._all()):
+            if cp.finished or self._owned_by_live_process(cp):
+                continue
+            reason = self._expired(cp)
+            if reason is not None:
+                cp.abandon(reason)
+                print(f"[WARN] Abandoned checkpoint {cp.run_id}: {reason} (last error: {cp.data.get('last_error')})")
+                continue
+            cp.claim()
+            return cp
+        return None
+
+    def cleanup(self) -> int:
+        """오래된 완료/포기 실행 디렉토리 삭제. 삭제한 수 반환"""
+        finished = [cp for cp in self._all() if cp.finished]
+        removed = 0
+        for cp in finished[: max(0, len(finished) - self.keep)]:
+            shutil.rmtree(cp.path.parent, ignore_errors=True)
+            removed += 1
+        return removed
+
+
+def create_checkpoint_store(config: Dict[str, Any]) -> CheckpointStore:
+    cp_cfg = config.get("pipeline", {}).get("checkpoints", {})
+    base_dir = Path(__file__).resolve().parent.parent
+    return CheckpointStore(
+        root=base_dir / cp_cfg.get("dir", ".runs"),
+        keep=int(cp_cfg.get("keep", 20)),
+        max_attempts=int(cp_cfg.get("max_attempts", 3)),
+        max_age_hours=float(cp_cfg.get("max_age_hours", 24)),
+        stale_seconds=float(cp_cfg.get("stale_seconds", 1800)),
+    )
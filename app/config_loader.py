@@ -42,6 +42,7 @@ def load_config() -> Dict[str, Any]:  # config를 읽어 최종 설정 dict를 
 
     cfg.setdefault("project", {})  # project 섹션이 없으면 생성
     cfg["project"].setdefault("timezone", "Asia/Seoul")  # 기본 타임존은 Asia/Seoul
+    cfg["project"].setdefault("cache_dir", ".cache")  # 로컬 캐시 디렉토리(repo 루트 기준)
 
     cfg.setdefault("pipeline", {})  # pipeline 섹션이 없으면 생성
     cfg["pipeline"].setdefault("batch_size", 4)  # 요구사항 기본값: 4장
@@ -1,10 +1,13 @@
 from __future__ import annotations
+import hashlib
+import html
+import os
 import re
 import shutil
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from app.drive_manager import DriveImage
 
@@ -41,23 +44,54 @@ class ContentBuilder:
         self.posts_dir.mkdir(parents=True, exist_ok=True)
         self.images_dir.mkdir(parents=True, exist_ok=True)
 
-    def _copy_images(self, images: List[DriveImage], slug: str) -> List[str]:
-        target_dir = self.images_dir / slug
-        target_dir.mkdir(parents=True, exist_ok=True)
-
+    def _file_sha256(self, path: Path) -> str:
+        h = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def _store_image(self, src: Path) -> Path:
+        # ✅ 내용 해시 기반 저장소: 같은 사진은 몇 번 발행돼도 by-hash/ab/cdef….jpg 한 벌만 존재
+        digest = self._file_sha256(src)
+        suffix = re.sub(r"[^0-9A-Za-z.]+", "", src.suffix.lower().rstrip("_")) or ".bin"
+        dst = self.images_dir / "by-hash" / digest[:2] / f"{digest[2:]}{suffix}"
+        if dst.exists():
+            return dst
+
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_name(f".{dst.name}.tmp")
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(src, tmp)  # 복사 대신 하드링크(같은 파일시스템이면 바이트 복사 없음)
+        except OSError:
+            shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+        return dst
+
+    def _copy_images(self, images: List[DriveImage]) -> List[str]:
         out_paths: List[str] = []
         for img in images:
-            src = Path(img.local_path)
-
-            # ✅ 파일명 안전화: 공백/한글/특수문자 -> _
-            safe_name = re.sub(r"[^0-9A-Za-z._-]+", "_", src.name)
-
-            dst = target_dir / safe_name
-            shutil.copy2(src, dst)
-            out_paths.append(str(dst))
-
+            src = getattr(img, "resized_path", None) or img.local_path
+            out_paths.append(str(self._store_image(Path(src))))
         return out_paths
 
+    def _store_variants(self, images: List[DriveImage]) -> List[List[Dict[str, Any]]]:
+        # 반응형 파생 이미지도 같은 by-hash 저장소에 넣고 웹 경로를 붙여 반환
+        out: List[List[Dict[str, Any]]] = []
+        for img in images:
+            stored: List[Dict[str, Any]] = []
+            for v in getattr(img, "variants", None) or []:
+                if not Path(v["path"]).exists():
+                    continue
+                dst = self._store_image(Path(v["path"]))
+                stored.append(dict(v, url=self._web_path(str(dst))))
+            out.append(stored)
+        return out
+
+    def _web_path(self, local_path: str) -> str:
+        rel = Path(local_path).relative_to(self.images_dir).as_posix()
+        return f"/blog/assets/images/{rel}"
 
     def _strip_front_matter(self, text: str) -> str:
         return re.sub(r"^---[\s\S]*?---\s*", "", text, flags=re.MULTILINE).lstrip()
@@ -75,7 +109,31 @@ class ContentBuilder:
         # 이미지 붙는 현상 방지 (강제 줄바꿈)
         result = re.sub(r"\)\s*!\[", ")\n\n![", result)
         return result
-    def _render_image_block(self, image_web_paths: List[str], captions_json: Dict[str, Any]) -> str:
+    def _render_picture(self, url: str, alt: str, variants: List[Dict[str, Any]]) -> str:
+        max_w = max(v["width"] for v in variants)
+        sizes = f"(max-width: {max_w}px) 100vw, {max_w}px"
+        alt_attr = html.escape(alt, quote=True)
+
+        def srcset(fmt: str) -> str:
+            return ", ".join(f'{v["url"]} {v["width"]}w' for v in variants if v["format"] == fmt)
+
+        parts = ["<picture>"]
+        for fmt in ("avif", "webp"):
+            entries = [v for v in variants if v["format"] == fmt]
+            if entries:
+                parts.append(f'  <source type="{entries[0]["mime"]}" srcset="{srcset(fmt)}" sizes="{sizes}">')
+        jpeg_srcset = srcset("jpeg")
+        srcset_attr = f' srcset="{jpeg_srcset}" sizes="{sizes}"' if jpeg_srcset else ""
+        parts.append(f'  <img src="{url}"{srcset_attr} alt="{alt_attr}" loading="lazy">')
+        parts.append("</picture>")
+        return "\n".join(parts)
+
+    def _render_image_block(
+        self,
+        image_web_paths: List[str],
+        captions_json: Dict[str, Any],
+        image_variants: Optional[List[List[Dict[str, Any]]]] = None,
+    ) -> str:
         items = captions_json.get("images", []) if isinstance(captions_json, dict) else []
 
         lines: List[str] = []
@@ -91,17 +149,28 @@ class ContentBuilder:
                 if summary:
                     alt = summary
 
-            lines.append(f"![{alt}]({url})")
+            variants = image_variants[i - 1] if image_variants and i - 1 < len(image_variants) else []
+            if variants:
+                lines.append(self._render_picture(url, alt, variants))
+            else:
+                lines.append(f"![{alt}]({url})")
             lines.append("")
 
         return "\n".join(lines).strip()
 
-    def _make_markdown(self, title: str, post_text: str, image_web_paths: List[str], captions_json: Dict[str, Any]) -> str:
+    def _make_markdown(
+        self,
+        title: str,
+        post_text: str,
+        image_web_paths: List[str],
+        captions_json: Dict[str, Any],
+        image_variants: Optional[List[List[Dict[str, Any]]]] = None,
+    ) -> str:
         body = self._strip_front_matter(post_text or "")
         body = self._inject_images(body, image_web_paths)
 
         # 사진 alt에 캡션 추가
-        img_block = self._render_image_block(image_web_paths, captions_json)
+        img_block = self._render_image_block(image_web_paths, captions_json, image_variants)
         if img_block:
             body = img_block + "\n\n---\n\n" + body.strip()
 
@@ -129,16 +198,17 @@ class ContentBuilder:
 
         slug = f"{base_slug}-{suffix}"
 
-        copied_local_paths = self._copy_images(images, slug)
+        copied_local_paths = self._copy_images(images)
         base = (self.baseurl or "").rstrip("/")
-        image_web_paths = [f"/blog/assets/images/{slug}/{Path(p).name}" for p in copied_local_paths]
+        image_web_paths = [self._web_path(p) for p in copied_local_paths]
+        image_variants = self._store_variants(images)
 
 
         date_prefix = self._today_prefix()
         post_filename = f"{date_prefix}-{slug}.md"
         post_path = self.posts_dir / post_filename
 
-        md = self._make_markdown(title, post_text, image_web_paths, captions_json)
+        md = self._make_markdown(title, post_text, image_web_paths, captions_json, image_variants)
 
         post_path.write_text(md, encoding="utf-8")
 
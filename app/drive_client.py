@@ -0,0 +1,76 @@
+from __future__ import annotations  # 타입 힌트 안정화
+import os  # 환경변수 읽기
+import threading  # 메모이즈 잠금
+from typing import Any, Optional  # 타입 힌트
+
+# google/httplib2 계열은 무거우므로 실제로 인증/서비스 생성할 때만 import (시작 시간 단축)
+
+
+SCOPES = ["https://www.googleapis.com/auth/drive"]  # Drive 읽기/쓰기 권한(최소 필요 권한)
+HTTP_TIMEOUT = 120  # Drive 요청 타임아웃(초)
+DEFAULT_SCAN_MODE = "full"  # config.drive.scan_mode 기본값(DriveManager와 precheck가 같은 값을 쓰도록 한 곳에서)
+
+_lock = threading.Lock()  # 동시에 처음 호출돼도 한 번만 생성
+_service: Optional[Any] = None  # 프로세스 전체에서 공유하는 Drive service
+
+
+def load_credentials() -> Any:  # 서비스계정 or OAuth(token.json) 자격 증명
+    from google.oauth2.credentials import Credentials  # OAuth 토큰 기반 인증
+    from google.oauth2.service_account import Credentials as SACredentials  # 서비스계정 인증
+    from google.auth.transport.requests import Request  # 토큰 갱신 요청
+
+    sa_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")  # 서비스계정 키 JSON 경로(환경변수)
+    if sa_path and os.path.exists(sa_path):  # 서비스계정 키가 있으면
+        return SACredentials.from_service_account_file(sa_path, scopes=SCOPES)  # 서비스계정 creds 생성
+
+    # ✅ repo 루트 기준으로 경로를 고정 (작업 디렉토리(os.getcwd())에 영향 안 받게)
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))  # .../hyun/app -> .../hyun
+
+    # ✅ token은 루트에 저장(추적 금지), client_secret은 루트 또는 secret 폴더 허용
+    token_path = os.path.join(base_dir, "token.json")
+    client_secret_candidates = [
+        os.path.join(base_dir, "client_secret.json"),
+        os.path.join(base_dir, "secrets", "client_secret.json"),
+    ]
+    client_secret_path = next((p for p in client_secret_candidates if os.path.exists(p)), None)
+
+    creds: Optional[Any] = None  # creds 초기화
+
+    if os.path.exists(token_path):  # token.json이 있으면
+        creds = Credentials.from_authorized_user_file(token_path, SCOPES)  # token으로 creds 생성
+
+    if not creds or not creds.valid:  # creds가 없거나 유효하지 않으면
+        if creds and creds.expired and creds.refresh_token:  # 만료됐고 refresh_token 있으면
+            creds.refresh(Request())  # 토큰 갱신
+        else:  # 처음 로그인 필요
+            if not client_secret_path:  # client_secret.json이 없으면
+                raise FileNotFoundError(
+                    "Missing OAuth client secret file. Checked:\n"
+                    f"- {client_secret_candidates[0]}\n"
+                    f"- {client_secret_candidates[1]}\n"
+                    "Or set GOOGLE_APPLICATION_CREDENTIALS for service account."
+                )
+            from google_auth_oauthlib.flow import InstalledAppFlow  # 로컬 OAuth 로그인 플로우(처음 로그인 때만)
+
+            flow = InstalledAppFlow.from_client_secrets_file(client_secret_path, SCOPES)  # 로컬 로그인 플로우 준비
+            creds = flow.run_local_server(port=0)  # 브라우저 열어서 로그인(자동)
+
+        with open(token_path, "w", encoding="utf-8") as f:  # 갱신/발급된 토큰 저장
+            f.write(creds.to_json())  # token.json 생성/업데이트
+
+    return creds
+
+
+def get_drive_service() -> Any:  # Drive service를 한 번만 만들어 StateClient/DriveManager가 공유
+    global _service
+    with _lock:
+        if _service is None:
+            import httplib2  # Drive API 전송 계층(keep-alive 연결 재사용)
+            from google_auth_httplib2 import AuthorizedHttp  # 인증 헤더/토큰 자동 갱신을 붙인 http
+            from googleapiclient.discovery import build  # Drive API client 생성
+
+            creds = load_credentials()  # token.json 읽기/갱신은 프로세스당 1회
+            http = AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))  # 인증된 공용 전송 계층
+            # static_discovery: 라이브러리에 포함된 discovery 문서 사용(네트워크 조회 없음)
+            _service = build("drive", "v3", http=http, static_discovery=True, cache_discovery=False)
+        return _service
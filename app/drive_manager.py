@@ -1,15 +1,24 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from io import BytesIO
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from googleapiclient.http import MediaIoBaseDownload
-from io import BytesIO
-from typing import Optional
+from app.drive_client import DEFAULT_SCAN_MODE
+from app.image_cache import ImageCache
 from app.state_client import StateClient
 
 IMAGE_MIME_PREFIX = "image/"
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # 청크 단위로 바로 디스크에 쓰기
+
 
 @dataclass
 class DriveImage:
@@ -18,52 +27,189 @@ class DriveImage:
     mime_type: str
     modified_time: str
     local_path: Optional[str] = None
+    md5_checksum: str = ""
+    resized_path: Optional[str] = None  # 리사이즈 결과(원본 local_path는 그대로 둠)
+    variants: Optional[List[Dict[str, Any]]] = None  # 반응형 파생 이미지(리사이즈 단계에서 채움)
 
 @dataclass
 class DriveManager:
     drive_service: Any
     input_folder_id: str
-    images_root: Path
+    download_root: Path  # 원본 다운로드 위치(git 추적 제외 캐시 디렉토리, 블로그에는 리사이즈 결과만 복사)
     batch_size: int = 4
 
     # ✅ Input_text (Google Drive 프롬프트 폴더)
     input_text_folder_id: Optional[str] = None
 
+    # ✅ 폴더 스캔: full = 매번 전체 목록, incremental = changes API 커서 이후 변경분만
+    scan_mode: str = DEFAULT_SCAN_MODE
+    scan_cache_path: Optional[Path] = None
+    prompt_cache_path: Optional[Path] = None  # 마지막으로 export한 Google Docs 프롬프트(doc id + modifiedTime)
+
+    # ✅ 이미지 다운로드: 동시 다운로드 수 / 파일별 재시도 횟수
+    download_concurrency: int = 4
+    download_retries: int = 3
+    image_cache: Optional[ImageCache] = None
+    _local: threading.local = field(default_factory=threading.local, init=False, repr=False)
+    last_pending_count: Optional[int] = field(default=None, init=False, repr=False)  # 이번 실행에서 스캔한 미처리 이미지 수
+
+    def _to_image(self, f: Dict[str, Any]) -> DriveImage:
+        return DriveImage(
+            file_id=f["id"],
+            name=f["name"],
+            mime_type=f.get("mimeType", ""),
+            modified_time=f.get("modifiedTime", ""),
+            md5_checksum=f.get("md5Checksum", ""),
+        )
+
+    def _is_input_image(self, f: Dict[str, Any]) -> bool:
+        return (
+            not f.get("trashed", False)
+            and self.input_folder_id in (f.get("parents") or [])
+            and f.get("mimeType", "").startswith(IMAGE_MIME_PREFIX)
+        )
+
     def _list_images_in_folder(self) -> List[DriveImage]:
         q = (
             f"'{self.input_folder_id}' in parents and "
             "trashed = false and "
             f"mimeType contains '{IMAGE_MIME_PREFIX}'"
         )
-        resp = self.drive_service.files().list(
-            q=q,
-            fields="files(id,name,mimeType,modifiedTime)",
-            pageSize=200,
-        ).execute()
-
-        files = resp.get("files", [])
         images: List[DriveImage] = []
-        for f in files:
-            images.append(
-                DriveImage(
-                    file_id=f["id"],
-                    name=f["name"],
-                    mime_type=f.get("mimeType", ""),
-                    modified_time=f.get("modifiedTime", ""),
-                )
-            )
+        page_token: Optional[str] = None
+        while True:
+            resp = self.drive_service.files().list(
+                q=q,
+                fields="nextPageToken, files(id,name,mimeType,modifiedTime,md5Checksum)",
+                pageSize=1000,
+                pageToken=page_token,
+            ).execute()
+            images.extend(self._to_image(f) for f in resp.get("files", []))
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                break
         images.sort(key=lambda x: x.modified_time, reverse=False)  # 오래된 순
         return images
 
-    def pick_new_images(self, state_client: StateClient) -> List[DriveImage]:
-        all_images = self._list_images_in_folder()
-        new_images: List[DriveImage] = []
-        for img in all_images:
-            if not state_client.is_processed(img.file_id):
-                new_images.append(img)
-            if len(new_images) >= self.batch_size:
+    def _load_scan_cache(self) -> Optional[Dict[str, Any]]:
+        if not self.scan_cache_path or not self.scan_cache_path.exists():
+            return None
+        try:
+            cache = json.loads(self.scan_cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if cache.get("folder_id") != self.input_folder_id or not cache.get("page_token"):
+            return None
+        return cache
+
+    def _save_scan_cache(self, page_token: str, images: List[DriveImage]) -> None:
+        if not self.scan_cache_path:
+            return
+        self.scan_cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache = {
+            "folder_id": self.input_folder_id,
+            "page_token": page_token,
+            "files": [asdict(img) for img in images],
+        }
+        tmp = self.scan_cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(cache, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(self.scan_cache_path)
+
+    def _scan_incremental(self) -> List[DriveImage]:
+        cache = self._load_scan_cache()
+        if cache is None:
+            # 커서를 먼저 받아야 전체 목록 조회 중에 올라온 파일도 다음 실행에서 잡힌다
+            page_token = self.drive_service.changes().getStartPageToken().execute()["startPageToken"]
+            images = self._list_images_in_folder()
+            self._save_scan_cache(page_token, images)
+            return images
+
+        known: Dict[str, DriveImage] = {}
+        for f in cache.get("files", []):
+            img = DriveImage(**f)
+            img.local_path = None
+            img.resized_path = None
+            img.variants = None
+            known[img.file_id] = img
+
+        page_token: str = cache["page_token"]
+        while True:
+            resp = self.drive_service.changes().list(
+                pageToken=page_token,
+                spaces="drive",
+                pageSize=1000,
+                fields="nextPageToken, newStartPageToken, "
+                "changes(fileId, removed, file(id,name,mimeType,modifiedTime,md5Checksum,parents,trashed))",
+            ).execute()
+            for ch in resp.get("changes", []):
+                f = ch.get("file") or {}
+                if ch.get("removed") or not self._is_input_image(f):
+                    known.pop(ch.get("fileId", ""), None)
+                else:
+                    known[f["id"]] = self._to_image(f)
+            if resp.get("newStartPageToken"):
+                page_token = resp["newStartPageToken"]
                 break
-        return new_images
+            page_token = resp["nextPageToken"]
+
+        images = sorted(known.values(), key=lambda x: x.modified_time)  # 오래된 순
+        self._save_scan_cache(page_token, images)
+        return images
+
+    def start_page_token(self) -> str:
+        return self.drive_service.changes().getStartPageToken().execute()["startPageToken"]
+
+    def poll_changes(self, page_token: str) -> Tuple[bool, str]:
+        """page_token 이후 입력 폴더에 새/수정된 이미지가 있는지 확인(변경 메타데이터만). (변경 여부, 다음 커서)"""
+        found = False
+        while True:
+            resp = self.drive_service.changes().list(
+                pageToken=page_token,
+                spaces="drive",
+                pageSize=1000,
+                fields="nextPageToken, newStartPageToken, changes(fileId, removed, file(mimeType,parents,trashed))",
+            ).execute()
+            found = found or any(
+                not ch.get("removed") and self._is_input_image(ch.get("file") or {}) for ch in resp.get("changes", [])
+            )
+            if resp.get("newStartPageToken"):
+                return found, resp["newStartPageToken"]
+            page_token = resp["nextPageToken"]
+
+    def list_images(self) -> List[DriveImage]:
+        if self.scan_mode == "incremental":
+            return self._scan_incremental()
+        return self._list_images_in_folder()
+
+    def pending_images(self, state_client: StateClient) -> List[DriveImage]:
+        """아직 처리되지 않은 이미지 전체(목록 순서 유지)"""
+        all_images = self.list_images()
+        unprocessed = set(state_client.filter_unprocessed(img.file_id for img in all_images))
+        pending = [img for img in all_images if img.file_id in unprocessed]
+        self.last_pending_count = len(pending)
+        return pending
+
+    def record_pending(self, pending: int) -> None:
+        """실행이 끝난 뒤 남은 미처리 이미지 수를 스캔 캐시에 기록 (app.precheck가 가벼운 import만으로 읽음)
+
+        이번 실행의 스캔 결과로 계산한 값을 받는다(Drive 재조회 없음).
+        """
+        cache = self._load_scan_cache() if self.scan_mode == "incremental" else None
+        if cache is None:
+            return
+        cache["pending"] = pending
+        tmp = self.scan_cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(cache, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(self.scan_cache_path)
+
+    def pick_new_images(self, state_client: StateClient) -> List[DriveImage]:
+        return self.pending_images(state_client)[: self.batch_size]
+
+    def pick_batches(self, state_client: StateClient, max_batches: int = 0) -> List[List[DriveImage]]:
+        """밀린 이미지를 batch_size씩 나눈 배치 목록(목록 조회 1회). max_batches=0이면 전부"""
+        pending = self.pending_images(state_client)
+        batches = [pending[i : i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        return batches[:max_batches] if max_batches > 0 else batches
 
     def _safe_filename(self, name: str) -> str:
         bad = ['<', '>', ':', '"', '/', '\\', '|', '?', '*']
@@ -71,37 +217,88 @@ class DriveManager:
             name = name.replace(ch, "_")
         return name
 
-    def _download_bytes(self, file_id: str) -> bytes:
+    def _thread_http(self) -> Any:
+        # httplib2는 스레드 간 공유가 안전하지 않으므로 워커 스레드마다 인증된 http를 따로 만든다
+        http = getattr(self._local, "http", None)
+        if http is None:
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+
+            base_http = self.drive_service._http
+            creds = getattr(base_http, "credentials", None)
+            http = AuthorizedHttp(creds, http=httplib2.Http()) if creds is not None else base_http
+            self._local.http = http
+        return http
+
+    def _download_to_file(self, file_id: str, dest: Path, use_thread_http: bool) -> None:
+        from googleapiclient.http import MediaIoBaseDownload  # 다운로드할 때만 로드(시작 시간 단축)
+
         request = self.drive_service.files().get_media(fileId=file_id)
-        fh = BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while not done:
+        if use_thread_http:
+            request.http = self._thread_http()
+
+        # 같은 폴더의 임시 파일로 받은 뒤 rename → 중간에 실패해도 반쯤 쓰인 파일이 남지 않음
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{dest.name}.", suffix=".part", dir=str(dest.parent))
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+                done = False
+                while not done:
+                    status, done = downloader.next_chunk()
+                    print(f"Downloading {file_id}: {int(status.progress() * 100)}%")
+            os.replace(tmp_name, dest)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def _download_one(self, img: DriveImage, target_dir: Path, use_thread_http: bool) -> DriveImage:
+        # 폰 업로드는 이름이 겹치기 쉬움(image.jpg 등) → file_id를 붙여 배치/스레드끼리 서로 덮어쓰지 않게
+        local_path = target_dir / f"{img.file_id}_{self._safe_filename(img.name)}"
+        if self.image_cache and self.image_cache.fetch(img, local_path):
+            img.local_path = str(local_path)
+            print(f"Using cached {img.name} (ID: {img.file_id})")
+            return img
+
+        print(f"Starting download for {img.name} (ID: {img.file_id})")
+        attempts = max(1, self.download_retries)
+        for attempt in range(attempts):
             try:
-                status, done = downloader.next_chunk()
-                print(f"Downloading {file_id}: {int(status.progress() * 100)}%")
+                self._download_to_file(img.file_id, local_path, use_thread_http)
+                break
             except Exception as e:
-                print(f"Download error for {file_id}: {e}")
-                raise
-        return fh.getvalue()
+                if attempt + 1 >= attempts:
+                    print(f"Download error for {img.file_id}: {e}")
+                    raise
+                wait = (1.0 * (2 ** attempt)) + random.uniform(0.0, 0.5)
+                print(f"[WARN] Download error for {img.file_id}: {e}. retry in {wait:.1f}s...")
+                time.sleep(wait)
+
+        if self.image_cache:
+            try:
+                self.image_cache.store(img, local_path)
+            except OSError as e:
+                print(f"[WARN] Failed to cache {img.name}: {e}")
+
+        img.local_path = str(local_path)
+        print(f"Downloaded {img.name}")
+        return img
 
     def download_images(self, images: List[DriveImage], subdir: str) -> List[DriveImage]:
-        target_dir = self.images_root / subdir
+        target_dir = self.download_root / subdir
         target_dir.mkdir(parents=True, exist_ok=True)
 
-        downloaded: List[DriveImage] = []
-        for img in images:
-            print(f"Starting download for {img.name} (ID: {img.file_id})")
-            safe_name = self._safe_filename(img.name)
-            local_path = target_dir / safe_name
-
-            data = self._download_bytes(img.file_id)
-            local_path.write_bytes(data)
-
-            img.local_path = str(local_path)
-            downloaded.append(img)
-            print(f"Downloaded {img.name}")
-
+        workers = max(1, min(self.download_concurrency, len(images)))
+        if workers == 1:
+            # 메인 스레드가 아니면(drain 단계 실행기) 공용 http를 다른 단계와 같이 쓰지 않도록 스레드 전용 http 사용
+            off_main = threading.current_thread() is not threading.main_thread()
+            downloaded = [self._download_one(img, target_dir, use_thread_http=off_main) for img in images]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="drive-dl") as pool:
+                futures = [pool.submit(self._download_one, img, target_dir, True) for img in images]
+                downloaded = [f.result() for f in futures]  # 입력 순서 유지, 실패는 그대로 전파
+
+        if self.image_cache:
+            self.image_cache.evict()
         return downloaded
 
     # ✅ Input_text 폴더에서 "최신 수정된 Google Docs 1개"를 프롬프트로 읽기
@@ -128,6 +325,15 @@ class DriveManager:
         print(f"[PROMPT] Using Google Docs: {doc_name}")
 
         file_id = files[0]["id"]
+        modified_time = files[0].get("modifiedTime", "")
+
+        # ✅ 위 목록 조회(메타데이터)만으로 변경 여부 판단: 같은 문서/같은 modifiedTime이면 export 생략
+        cached = self._load_prompt_cache()
+        if cached and cached.get("doc_id") == file_id and cached.get("modified_time") == modified_time:
+            print("[PROMPT] Unchanged since last export, using cached text")
+            return cached.get("text", "")
+
+        from googleapiclient.http import MediaIoBaseDownload
 
         request = self.drive_service.files().export_media(
             fileId=file_id,
@@ -139,7 +345,26 @@ class DriveManager:
         while not done:
             _, done = downloader.next_chunk()
 
-        return fh.getvalue().decode("utf-8", errors="replace").strip()
+        text = fh.getvalue().decode("utf-8", errors="replace").strip()
+        self._save_prompt_cache(file_id, modified_time, text)
+        return text
+
+    def _load_prompt_cache(self) -> Optional[Dict[str, Any]]:
+        if not self.prompt_cache_path or not self.prompt_cache_path.exists():
+            return None
+        try:
+            return json.loads(self.prompt_cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _save_prompt_cache(self, doc_id: str, modified_time: str, text: str) -> None:
+        if not self.prompt_cache_path or not modified_time:
+            return
+        self.prompt_cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache = {"doc_id": doc_id, "modified_time": modified_time, "text": text}
+        tmp = self.prompt_cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.prompt_cache_path)
 
     # ✅ 기존 함수명 호환 (pipeline이 아직 load_notepad_text() 쓰고 있어도 OK)
     def load_notepad_text(self) -> str:
@@ -148,38 +373,53 @@ class DriveManager:
 
 def create_drive_manager(config: Dict[str, Any], drive_service: Any) -> DriveManager:
     drive_cfg = config.get("drive", {})
-    blog_cfg = config.get("blog", {})
     pipeline_cfg = config.get("pipeline", {})
 
     input_folder_id = drive_cfg.get("input_folder_id")
     if not input_folder_id:
         raise ValueError("config.drive.input_folder_id is required")
 
-    images_path = blog_cfg.get("images_path", "blog/assets/images")
     batch_size = int(pipeline_cfg.get("batch_size", 4))
 
+    scan_mode = drive_cfg.get("scan_mode", DEFAULT_SCAN_MODE)
+    if scan_mode not in ("full", "incremental"):
+        raise ValueError(f"config.drive.scan_mode must be 'full' or 'incremental' (got {scan_mode})")
+
     # ✅ Input_text 설정(없어도 동작)
     input_text_folder_id = drive_cfg.get("input_text_folder_id")
 
     base_dir = Path(__file__).resolve().parent.parent
-    images_root = base_dir / images_path
+    cache_dir = base_dir / config.get("project", {}).get("cache_dir", ".cache")
+
+    # ✅ 원본 이미지 로컬 캐시(0이면 사용 안 함)
+    image_cache_max_mb = int(drive_cfg.get("image_cache_max_mb", 1024))
+    image_cache = None
+    if image_cache_max_mb > 0:
+        image_cache = ImageCache(root=cache_dir / "images", max_bytes=image_cache_max_mb * 1024 * 1024)
 
     return DriveManager(
         drive_service=drive_service,
         input_folder_id=input_folder_id,
-        images_root=images_root,
+        download_root=cache_dir,  # .cache/<subdir>
         batch_size=batch_size,
         input_text_folder_id=input_text_folder_id,
+        scan_mode=scan_mode,
+        scan_cache_path=cache_dir / "drive_scan.json",
+        prompt_cache_path=cache_dir / "prompt_doc.json",
+        download_concurrency=int(drive_cfg.get("download_concurrency", 4)),
+        download_retries=int(drive_cfg.get("download_retries", 3)),
+        image_cache=image_cache,
     )
 
 
 if __name__ == "__main__":
     from app.config_loader import load_config
-    from app.state_client import create_state_client, _build_drive_service
+    from app.drive_client import get_drive_service
+    from app.state_client import create_state_client
 
     cfg = load_config()
-    service = _build_drive_service()
-    state = create_state_client(cfg)
+    service = get_drive_service()
+    state = create_state_client(cfg, service)
     mgr = create_drive_manager(cfg, service)
 
     new_imgs = mgr.pick_new_images(state)
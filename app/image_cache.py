@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Tuple
+
+
+@dataclass
+class ImageCache:
+    """Drive 원본 이미지를 로컬에 보관하는 content-addressed 캐시 (크기 제한 LRU)"""
+
+    root: Path
+    max_bytes: int = 1024 * 1024 * 1024
+
+    def key(self, img: Any) -> str:
+        # 같은 file_id라도 내용이 바뀌면(md5/modifiedTime) 다른 키가 된다
+        version = getattr(img, "md5_checksum", "") or getattr(img, "modified_time", "")
+        return hashlib.sha256(f"{img.file_id}:{version}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _link_atomic(self, src: Path, dst: Path) -> None:
+        # 원본은 리사이즈 단계에서 수정되지 않으므로 하드링크로 공유(다른 파일시스템이면 복사)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{dst.name}.", suffix=".part", dir=str(dst.parent))
+        os.close(fd)
+        try:
+            os.unlink(tmp_name)
+            try:
+                os.link(src, tmp_name)
+            except OSError:
+                shutil.copyfile(src, tmp_name)
+            os.replace(tmp_name, dst)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def fetch(self, img: Any, dest: Path) -> bool:
+        """캐시에 있으면 dest에 연결하고 True"""
+        cached = self._path(self.key(img))
+        if not cached.exists():
+            return False
+        self._link_atomic(cached, dest)
+        os.utime(cached)  # LRU: 최근 사용 시각 갱신
+        return True
+
+    def store(self, img: Any, src: Path) -> None:
+        if self.max_bytes <= 0:
+            return
+        self._link_atomic(src, self._path(self.key(img)))
+
+    def evict(self) -> int:
+        """총 크기가 max_bytes를 넘으면 오래 안 쓴 파일부터 삭제. 삭제한 파일 수 반환"""
+        if not self.root.exists():
+            return 0
+        entries: List[Tuple[float, int, Path]] = []
+        total = 0
+        for p in self.root.glob("*/*"):
+            if not p.is_file() or p.name.startswith("."):
+                continue
+            st = p.stat()
+            entries.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+
+        removed = 0
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+EXIF_ORIENTATION = 0x0112
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)  # 90/270도 회전(가로세로가 바뀜)
+MANIFEST_NAME = "manifest.json"
+
+# format 이름 -> (Pillow 저장 포맷, 확장자, MIME)
+FORMATS: Dict[str, Tuple[str, str, str]] = {
+    "jpeg": ("JPEG", ".jpg", "image/jpeg"),
+    "webp": ("WEBP", ".webp", "image/webp"),
+    "avif": ("AVIF", ".avif", "image/avif"),
+}
+
+
+@dataclass
+class ResizeSettings:
+    max_width: int = 1024
+    max_height: int = 1024
+    quality: int = 85
+    widths: Tuple[int, ...] = ()  # 반응형 파생 이미지 너비들(비어 있으면 생성 안 함)
+    formats: Tuple[str, ...] = ("jpeg", "webp")
+
+
+@dataclass
+class ResizeResult:
+    path: str
+    resized_path: Optional[str] = None  # 리사이즈 결과(원본은 그대로 둠)
+    orig_size: Optional[Tuple[int, int]] = None
+    new_size: Optional[Tuple[int, int]] = None
+    skipped: bool = False  # 원본이 이미 충분히 작아서 축소하지 않음
+    cached: bool = False  # 같은 원본/설정의 이전 결과를 재사용(디코딩/인코딩 없음)
+    error: Optional[str] = None
+    variants: List[Dict[str, Any]] = field(default_factory=list)  # {"format","mime","width","height","path"}
+
+
+def _supported_formats(formats: Tuple[str, ...]) -> List[str]:
+    Image.init()
+    return [f for f in formats if f in FORMATS and FORMATS[f][0] in Image.SAVE]  # AVIF는 플러그인이 있을 때만
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(path: str, settings: ResizeSettings) -> str:
+    """원본 내용 해시 + 리사이즈 설정 → 결과 디렉토리 키 (설정이 바뀌면 그 설정분만 다시 처리)"""
+    settings_json = json.dumps(asdict(settings), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{_file_sha256(path)}:{settings_json}".encode("utf-8")).hexdigest()
+
+
+def _load_manifest(out_dir: Path) -> Optional[Dict[str, Any]]:
+    """결과 파일이 전부 남아 있을 때만 manifest 반환"""
+    mpath = out_dir / MANIFEST_NAME
+    if not mpath.exists():
+        return None
+    try:
+        manifest = json.loads(mpath.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    paths = [manifest.get("resized", "")] + [v["path"] for v in manifest.get("variants") or []]
+    if not all(p and Path(p).exists() for p in paths):
+        return None
+    return manifest
+
+
+def _save_manifest(out_dir: Path, manifest: Dict[str, Any]) -> None:
+    tmp = out_dir / f".{MANIFEST_NAME}.tmp"
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    tmp.replace(out_dir / MANIFEST_NAME)
+
+
+def _write_derivatives(im: Image.Image, stem: str, out_dir: Path, settings: ResizeSettings) -> List[Dict[str, Any]]:
+    # 원본보다 큰 너비는 만들지 않음(원본이 더 작으면 원본 너비 1개)
+    widths = sorted({w for w in settings.widths if w < im.width} | {min(max(settings.widths), im.width)})
+    base = im.convert("RGB") if im.mode not in ("RGB", "L") else im
+
+    variants: List[Dict[str, Any]] = []
+    for w in widths:
+        h = max(1, round(im.height * w / im.width))
+        scaled = base if w == base.width else base.resize((w, h), Image.Resampling.LANCZOS)
+        for fmt in _supported_formats(settings.formats):
+            pil_format, ext, mime = FORMATS[fmt]
+            out = out_dir / f"{stem}-{w}w{ext}"
+            scaled.save(out, format=pil_format, quality=settings.quality)
+            variants.append({"format": fmt, "mime": mime, "width": w, "height": h, "path": str(out)})
+    return variants
+
+
+def resize_image(path: str, settings: ResizeSettings, cache_dir: str) -> ResizeResult:
+    """이미지 1장을 cache_dir 아래 결과 디렉토리로 리사이즈 + 반응형 파생 이미지 생성
+
+    프로세스 풀에서 호출되므로 모듈 최상위 함수. 원본 파일은 수정하지 않는다.
+    """
+    try:
+        src = Path(path)
+        key = cache_key(path, settings)
+        out_dir = Path(cache_dir) / key[:2] / key
+
+        manifest = _load_manifest(out_dir)
+        if manifest is not None:
+            os.utime(out_dir / MANIFEST_NAME)  # LRU: 최근 사용 시각 갱신
+            return ResizeResult(
+                path=path,
+                resized_path=manifest["resized"],
+                orig_size=tuple(manifest["orig_size"]),
+                new_size=tuple(manifest["size"]),
+                skipped=manifest["orig_size"] == manifest["size"],
+                cached=True,
+                variants=manifest.get("variants") or [],
+            )
+
+        out_dir.mkdir(parents=True, exist_ok=True)
+        resized = out_dir / src.name
+        with Image.open(path) as im:
+            raw_w, raw_h = im.size
+            rotated = im.getexif().get(EXIF_ORIENTATION) in ROTATED_ORIENTATIONS
+            orig_size = (raw_h, raw_w) if rotated else (raw_w, raw_h)
+            small_enough = orig_size[0] <= settings.max_width and orig_size[1] <= settings.max_height
+
+            variants: List[Dict[str, Any]] = []
+            if small_enough and not settings.widths:
+                shutil.copyfile(path, resized)  # 디코딩 없이 그대로 사용
+                new_size = orig_size
+            else:
+                # JPEG은 디코딩 단계에서 1/2, 1/4, 1/8로 축소 → 원본 해상도 픽셀을 전부 풀지 않음
+                target = (settings.max_height, settings.max_width) if rotated else (settings.max_width, settings.max_height)
+                im.draft("RGB", target)
+
+                # EXIF 회전 적용
+                im = ImageOps.exif_transpose(im)
+
+                if small_enough:
+                    shutil.copyfile(path, resized)
+                else:
+                    # 리사이즈
+                    im.thumbnail((settings.max_width, settings.max_height), Image.Resampling.LANCZOS)
+                    # 저장 (JPEG 품질 설정)
+                    if src.suffix.lower() in (".jpg", ".jpeg"):
+                        im.save(resized, quality=settings.quality)
+                    else:
+                        im.save(resized)
+                new_size = im.size
+                if settings.widths:
+                    variants = _write_derivatives(im, src.stem, out_dir, settings)
+
+        _save_manifest(out_dir, {
+            "source": src.name,
+            "resized": str(resized),
+            "orig_size": list(orig_size),
+            "size": list(new_size),
+            "variants": variants,
+        })
+        return ResizeResult(path=path, resized_path=str(resized), orig_size=orig_size, new_size=new_size,
+                            skipped=small_enough, variants=variants)
+    except Exception as e:
+        return ResizeResult(path=path, error=f"{type(e).__name__}: {e}")
+
+
+def evict_cache(cache_dir: str, max_bytes: int) -> int:
+    """결과 디렉토리 총 크기가 max_bytes를 넘으면 오래 안 쓴 것부터 통째로 삭제. 삭제한 디렉토리 수 반환"""
+    root = Path(cache_dir)
+    if max_bytes <= 0 or not root.exists():
+        return 0
+    entries: List[Tuple[float, int, Path]] = []
+    total = 0
+    for out_dir in root.glob("*/*"):
+        if not out_dir.is_dir():
+            continue
+        files = [p for p in out_dir.iterdir() if p.is_file()]
+        size = sum(p.stat().st_size for p in files)
+        mpath = out_dir / MANIFEST_NAME
+        used = mpath.stat().st_mtime if mpath.exists() else out_dir.stat().st_mtime
+        entries.append((used, size, out_dir))
+        total += size
+
+    removed = 0
+    for _, size, out_dir in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(out_dir, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def resize_images(paths: List[str], settings: ResizeSettings, cache_dir: str, workers: int = 0) -> List[ResizeResult]:
+    """여러 장을 프로세스 풀에서 병렬 리사이즈. workers=0이면 CPU 코어 수만큼"""
+    if not paths:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        return [resize_image(p, settings, cache_dir) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(resize_image, paths, [settings] * len(paths), [cache_dir] * len(paths)))
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+def make_cache_key(
+    provider: str,
+    model: str,
+    generation_config: Dict[str, Any],
+    prompt: str,
+    image_hashes: Sequence[str] = (),
+) -> str:
+    """provider + model + generationConfig + 프롬프트 + 이미지 내용 해시 → 캐시 키"""
+    material = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "generation_config": generation_config,
+            "prompt": prompt,
+            "images": list(image_hashes),
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class LLMCache:
+    """LLM 응답 디스크 캐시 (TTL + 크기 제한 LRU)"""
+
+    root: Path
+    ttl_seconds: float = 7 * 24 * 3600
+    max_bytes: int = 50 * 1024 * 1024
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if time.time() - float(entry.get("created_at", 0)) > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # LRU: 최근 사용 시각 갱신
+        return entry.get("value")
+
+    def put(self, key: str, value: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps({"created_at": time.time(), "value": value}, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+        self.evict()
+
+    def evict(self) -> int:
+        """총 크기가 max_bytes를 넘으면 오래 안 쓴 항목부터 삭제. 삭제한 항목 수 반환"""
+        if not self.root.exists():
+            return 0
+        entries: List[Tuple[float, int, Path]] = []
+        total = 0
+        for p in self.root.glob("*/*.json"):
+            st = p.stat()
+            entries.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+
+        removed = 0
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
@@ -1,9 +1,37 @@
 from __future__ import annotations  # 타입 힌트
-from app.pipeline import run_pipeline  # 파이프라인 실행 함수
+import argparse  # 커맨드라인 옵션
+from types import SimpleNamespace  # precheck 결과 출력용
+from typing import Any  # 타입 힌트
 
+# app.pipeline(이미지/Drive/Gemini 라이브러리)은 실제로 실행할 때만 import → "새 이미지 없음"은 가볍게 끝냄
 
-if __name__ == "__main__":  # 엔트리포인트
-    result = run_pipeline()  # 실행
+
+def _parse_args() -> argparse.Namespace:  # 커맨드라인 옵션 파싱
+    parser = argparse.ArgumentParser(description="Drive -> Gemini -> blog post pipeline")
+    parser.add_argument("mode", nargs="?", choices=["run", "watch"], default="run", help="run: 1회 실행(기본), watch: 상주하며 새 이미지 감시")
+    parser.add_argument("--drain", action="store_true", default=None, help="밀린 이미지를 예산 안에서 여러 글로 처리")
+    parser.add_argument("--max-posts", type=int, default=None, help="drain 모드 최대 글 수(기본: config)")
+    parser.add_argument("--max-seconds", type=float, default=None, help="drain 모드 시간 예산(초, 기본: config)")
+    parser.add_argument("--no-resume", dest="resume", action="store_false", default=None, help="실패한 이전 실행을 이어가지 않고 새로 시작")
+    parser.add_argument("--no-precheck", dest="precheck", action="store_false", default=True, help="가벼운 사전 확인 없이 바로 전체 파이프라인 실행")
+    return parser.parse_args()
+
+
+def _watch(args: argparse.Namespace) -> None:  # 상주 감시 모드(SIGTERM/Ctrl+C로 종료)
+    from app.config_loader import load_config
+    from app.watcher import create_watcher
+
+    cfg = load_config()  # 설정은 시작할 때 1회만 읽음
+    watcher = create_watcher(cfg)
+    if args.resume is not None:
+        watcher.pipeline.resume = args.resume
+    if args.drain is not None:
+        watcher.drain = args.drain
+    watcher.max_posts, watcher.max_seconds = args.max_posts, args.max_seconds
+    watcher.run_forever()
+
+
+def _print_result(result: Any) -> None:  # 실행 결과 출력
     print("")  # 보기 좋게 한 줄
     print("=== PIPELINE RESULT ===")  # 결과 헤더
     print("OK:", result.ok)  # 성공 여부
@@ -11,5 +39,40 @@ if __name__ == "__main__":  # 엔트리포인트
     print("Processed:", result.processed_count)  # 처리 수
     print("Post Path:", result.post_path)  # 포스트 경로
     print("Post Slug:", result.post_slug)  # slug
+    if result.post_slugs and len(result.post_slugs) > 1:  # drain 모드로 여러 글을 냈으면
+        print("Posts:", ", ".join(result.post_slugs))  # 전부 출력
     if result.errors:  # 에러가 있으면
         print("Errors:", result.errors)  # 에러 출력
+
+
+def _run(args: argparse.Namespace) -> None:  # 1회 실행
+    from app.config_loader import load_config
+
+    cfg = load_config()
+    if args.precheck and cfg.get("pipeline", {}).get("precheck", True):
+        from app.precheck import precheck
+
+        try:
+            has_work = precheck(cfg, resume=args.resume is not False)
+        except Exception as e:  # 사전 확인 실패는 전체 실행으로 넘김
+            print(f"[WARN] Precheck failed ({type(e).__name__}: {e}); running the full pipeline")
+            has_work = None
+        if has_work is False:  # 확실히 할 일 없음 → 무거운 모듈 로드 없이 종료
+            _print_result(SimpleNamespace(
+                ok=True, message="No new images (precheck).", processed_count=0,
+                post_path=None, post_slug=None, post_slugs=[], errors=[],
+            ))
+            return
+
+    from app.pipeline import run_pipeline  # 파이프라인 실행 함수
+
+    result = run_pipeline(drain=args.drain, max_posts=args.max_posts, max_seconds=args.max_seconds, resume=args.resume, config=cfg)  # 실행
+    _print_result(result)
+
+
+if __name__ == "__main__":  # 엔트리포인트
+    args = _parse_args()  # 옵션 읽기(없으면 config 설정 사용)
+    if args.mode == "watch":
+        _watch(args)
+    else:
+        _run(args)
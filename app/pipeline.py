@@ -3,17 +3,20 @@ import subprocess
 import traceback
 import json
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-from PIL import Image, ImageOps
+from typing import Any, Dict, List, Optional, Tuple
 
+from app.checkpoint import RunCheckpoint, create_checkpoint_store
 from app.config_loader import load_config
-from app.state_client import create_state_client, _build_drive_service
+from app.drive_client import get_drive_service
+from app.state_client import create_state_client
 from app.drive_manager import create_drive_manager, DriveImage
 from app.ai_processor import create_ai_processor
 from app.content_builder import create_content_builder, BuildResult
 from app.git_publisher import create_git_publisher
+from app.rate_limiter import CircuitOpenError
+from app.stage_executor import Stage, StageExecutor
 import time
 
 @dataclass
@@ -24,16 +27,22 @@ class PipelineResult:
     post_path: Optional[str] = None
     post_slug: Optional[str] = None
     errors: Optional[List[str]] = None
+    post_slugs: Optional[List[str]] = None  # drain 모드에서 이번 실행에 발행한 글 전부
 
 class Pipeline:
     def __init__(self, config: Dict[str, Any]) -> None:
         self.config = config
-        self._drive_service = _build_drive_service()
-        self.state_client = create_state_client(config)
+        self._drive_service = get_drive_service()  # StateClient/DriveManager가 같은 service와 http를 공유
+        self.state_client = create_state_client(config, self._drive_service)
         self.drive_manager = create_drive_manager(config, self._drive_service)
         self.ai = create_ai_processor(config)
         self.builder = create_content_builder(config)
         self.git = create_git_publisher(config)
+        self._prompt: Optional[str] = None  # 한 번의 실행(drain 포함) 동안 Drive 프롬프트는 1회만 로드
+
+        # ✅ 실행별 체크포인트(.runs/<run_id>/checkpoint.json): 실패한 실행은 다음에 첫 미완료 단계부터 이어감
+        self.checkpoints = create_checkpoint_store(config)
+        self.resume = bool(config.get("pipeline", {}).get("resume", True))
 
     def _log(self, level: str, msg: str) -> None:
         ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -76,53 +85,78 @@ class Pipeline:
             self._log("ERROR", f"Failed to download images: {e}")
             raise
 
+    def _resize_cache_dir(self) -> Path:
+        base_dir = Path(__file__).resolve().parent.parent
+        return base_dir / self.config.get("project", {}).get("cache_dir", ".cache") / "resized"
+
+    def _cleanup_local(self, images: List[DriveImage]) -> None:
+        """발행이 끝난 원본 다운로드 삭제 + 리사이즈 캐시 크기 제한 (원본은 ImageCache에 따로 보관됨)"""
+        from app.image_resizer import evict_cache
+
+        try:
+            download_root = self.drive_manager.download_root.resolve()
+            for img in images:
+                if img.local_path and download_root in Path(img.local_path).resolve().parents:
+                    Path(img.local_path).unlink(missing_ok=True)
+            max_mb = int(self.config.get("image_resize", {}).get("cache_max_mb", 512))
+            removed = evict_cache(str(self._resize_cache_dir()), max_mb * 1024 * 1024)
+            if removed:
+                self._log("INFO", f"Evicted {removed} old resize result(s) from cache")
+        except OSError as e:  # 정리 실패로 이미 끝난 실행을 실패 처리하지 않음
+            self._log("WARN", f"Local cleanup failed: {e}")
+
     def _resize_images(self, downloaded: List[DriveImage]) -> None:
-        """다운로드된 이미지를 리사이즈하여 크기를 줄임"""
-        resize_cfg = self.config.get("image_resize", {})
-        max_width = resize_cfg.get("max_width", 1024)
-        max_height = resize_cfg.get("max_height", 1024)
-        quality = resize_cfg.get("quality", 85)
+        """다운로드된 이미지를 리사이즈하여 크기를 줄임 (프로세스 풀 병렬)"""
+        from app.image_resizer import ResizeSettings, resize_images  # PIL은 리사이즈 단계에서만 로드
 
-        for img in downloaded:
-            if not img.local_path:
-                continue
-            path = Path(img.local_path)
-            if not path.exists():
+        resize_cfg = self.config.get("image_resize", {})
+        settings = ResizeSettings(
+            max_width=resize_cfg.get("max_width", 1024),
+            max_height=resize_cfg.get("max_height", 1024),
+            quality=resize_cfg.get("quality", 85),
+            widths=tuple(resize_cfg.get("widths", [])),
+            formats=tuple(resize_cfg.get("formats", ["jpeg", "webp"])),
+        )
+        workers = int(resize_cfg.get("workers", 0))
+        cache_dir = self._resize_cache_dir()
+
+        by_path = {img.local_path: img for img in downloaded if img.local_path and Path(img.local_path).exists()}
+        for res in resize_images(list(by_path), settings, str(cache_dir), workers=workers):
+            img = by_path[res.path]
+            if res.error:
+                self._log("ERROR", f"Failed to resize {img.name}: {res.error}")
                 continue
-
-            try:
-                with Image.open(path) as im:
-                    # EXIF 회전 적용
-                    im = ImageOps.exif_transpose(im)
-                    
-                    # 원본 크기 확인
-                    orig_width, orig_height = im.size
-                    if orig_width <= max_width and orig_height <= max_height:
-                        self._log("INFO", f"Image {img.name} already small enough, skipping resize")
-                        continue
-
-                    # 리사이즈
-                    im.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-                    # 저장 (JPEG 품질 설정)
-                    if path.suffix.lower() in ('.jpg', '.jpeg'):
-                        im.save(path, quality=quality)
-                    else:
-                        im.save(path)
-                    self._log("INFO", f"Resized {img.name}: {orig_width}x{orig_height} -> {im.size}")
-            except Exception as e:
-                self._log("ERROR", f"Failed to resize {img.name}: {e}")
+            img.resized_path = res.resized_path
+            img.variants = res.variants or None
+            if res.cached:
+                self._log("INFO", f"Reusing cached resize for {img.name} ({len(res.variants)} variant(s))")
+            elif res.skipped:
+                self._log("INFO", f"Image {img.name} already small enough, skipping resize")
+            else:
+                self._log("INFO", f"Resized {img.name}: {res.orig_size[0]}x{res.orig_size[1]} -> {res.new_size}")
+            if res.variants and not res.cached:
+                self._log("INFO", f"Generated {len(res.variants)} responsive variant(s) for {img.name}")
+
+    def _load_prompt(self) -> str:
+        if self._prompt is None:
+            self._log("INFO", "Loading prompt from Google Drive (latest Google Docs)...")
+            self._prompt = self.drive_manager.load_prompt_text()
+            self._log("INFO", f"Prompt loaded: {len(self._prompt)} chars")
+        return self._prompt
 
     def _ai_generate(self, downloaded: List[DriveImage]) -> tuple[Dict[str, Any], str]:
-        self._log("INFO", "Generating captions (1 call for up to 4 images)...")
-        captions = self.ai.generate_photo_captions(downloaded)
-
-        self._log("INFO", "Loading prompt from Google Drive (latest Google Docs)...")
-        prompt = self.drive_manager.load_prompt_text()
-        self._log("INFO", f"Prompt loaded: {len(prompt)} chars")
+        prompt = self._load_prompt()
 
-        self._log("INFO", "Generating post text (1 call)...")
-        post_text = self.ai.generate_post_markdown(captions, prompt)
+        if self.ai.fused_mode:
+            self._log("INFO", "Generating captions + post text (fused: 1 call for up to 4 images)...")
+        else:
+            self._log("INFO", "Generating captions (1 call for up to 4 images), then post text (1 call)...")
+        captions, post_text = self.ai.generate_captions_and_post(downloaded, prompt)
 
+        self._log("INFO", f"Gemini rate limiter: {self.ai.rate_stats()}")
+        usage = self.ai.usage_summary()
+        if usage:
+            self._log("INFO", f"Gemini token usage: {usage}")
         return captions, post_text
 
     def _build_content(self, captions: Dict[str, Any], post_text: str, downloaded: List[DriveImage]) -> BuildResult:
@@ -157,61 +191,183 @@ class Pipeline:
         json_path.write_text(json.dumps(posts, ensure_ascii=False, indent=2), encoding="utf-8")
         self._log("INFO", "posts.json updated.")
 
-    def _git_publish(self, build_result: BuildResult) -> None:
+    def _git_publish(self, slugs: List[str]) -> None:
+        """이번 실행에서 만든 글 전부를 커밋 1개 + push 1회로 발행"""
         git_cfg = self.config.get("git", {})
-        template = git_cfg.get("commit_message_template", "chore: publish {slug}")
-        msg = template.format(slug=build_result.post_slug)
+        if len(slugs) == 1:
+            template = git_cfg.get("commit_message_template", "chore: publish {slug}")
+            msg = template.format(slug=slugs[0])
+        else:
+            template = git_cfg.get("drain_commit_message_template", "chore: publish {count} posts ({slugs})")
+            msg = template.format(count=len(slugs), slugs=", ".join(slugs))
         self._log("INFO", f"Publishing to GitHub (branch={self.git.branch})...")
         self.git.publish(msg)
         self._log("INFO", "GitHub publish done.")
 
-    def _update_state(self, downloaded: List[DriveImage], slug: str) -> int:
-        """구글 드라이브의 state.json에 처리 완료 마킹"""
-        self._log("INFO", "Updating state.json on Google Drive (mark processed)...")
-        ok_count = 0
-        for img in downloaded:
-            try:
-                self.state_client.mark_processed(img.file_id, slug)
-                ok_count += 1
-            except Exception as e:
-                self._log("ERROR", f"Failed to mark processed for {img.file_id}: {e}")
-        self._log("INFO", f"State updated for {ok_count}/{len(downloaded)} image(s).")
-        return ok_count
+    def _update_state(self, published: List[Tuple[List[DriveImage], str]]) -> Optional[int]:
+        """구글 드라이브의 state.json에 처리 완료 마킹 (글이 여러 개여도 업로드 1회)
 
-    def run(self) -> PipelineResult:
-        errors: List[str] = []
+        새로 기록된 건수 반환(이미 기록돼 있던 ID는 0건일 수 있음), 기록 실패면 None
+        """
+        total = sum(len(images) for images, _ in published)
+        self._log("INFO", "Updating state.json on Google Drive (mark processed)...")
         try:
-            self._preflight_security_checks()
+            with self.state_client.transaction() as tx:
+                for images, slug in published:
+                    for img in images:
+                        tx.mark(img.file_id, slug)
         except Exception as e:
-            return PipelineResult(ok=False, message=str(e), errors=[str(e)])
-
+            self._log("ERROR", f"Failed to mark processed for {total} image(s): {e}")
+            return None
+        self._log("INFO", f"State updated: {tx.added} new of {total} image(s) ({total - tx.added} already recorded).")
+        return tx.added
+
+    def _build_post(self, downloaded: List[DriveImage], captions: Dict[str, Any], post_text: str) -> BuildResult:
+        build_result = self._build_content(captions, post_text, downloaded)
+
+        # 메타데이터 업데이트 (제목 추출 로직 포함)
+        title = post_text.splitlines()[0].strip("# ")
+        self._update_posts_metadata(build_result, title)
+        return build_result
+
+    def _record_pending(self, processed: int = 0) -> None:
+        """이번 실행의 스캔 결과 - 방금 처리한 수를 기록 → 다음 cron 실행의 precheck가 무거운 import 없이 판단"""
+        scanned = self.drive_manager.last_pending_count
+        if scanned is None:  # 체크포인트에서 이어간 실행처럼 이번에 스캔하지 않았으면 이전 값 유지
+            return
+        pending = max(0, scanned - processed)
+        try:
+            self.drive_manager.record_pending(pending)
+            self._log("INFO", f"Remaining unprocessed image(s): {pending}")
+        except Exception as e:
+            self._log("WARN", f"Failed to record pending count: {e}")
+
+    def _images_from_checkpoint(self, items: List[Dict[str, Any]]) -> List[DriveImage]:
+        return [DriveImage(**d) for d in items]
+
+    def _images_to_checkpoint(self, images: List[DriveImage]) -> List[Dict[str, Any]]:
+        return [asdict(img) for img in images]
+
+    def _drain_stages(self, cp: RunCheckpoint) -> List[Stage]:
+        """drain 모드 단계: 다운로드 → 리사이즈 → AI → 빌드 (항목은 (배치 번호, 데이터))"""
+        stages_cfg = self.config.get("pipeline", {}).get("stages", {})
+
+        def opts(name: str, workers: int = 1) -> Dict[str, int]:
+            c = stages_cfg.get(name, {})
+            return {"workers": int(c.get("workers", workers)), "queue_size": int(c.get("queue_size", 1))}
+
+        def download(item: Tuple[int, List[DriveImage]]) -> Tuple[int, List[DriveImage]]:
+            i, batch = item
+            self._log("INFO", f"[batch {i}] Downloading {len(batch)} image(s)...")
+            return i, self.drive_manager.download_images(batch, subdir="incoming")
+
+        def resize(item: Tuple[int, List[DriveImage]]) -> Tuple[int, List[DriveImage]]:
+            self._resize_images(item[1])
+            return item
+
+        def generate(item: Tuple[int, List[DriveImage]]) -> Tuple[int, List[DriveImage], Dict[str, Any], str]:
+            i, downloaded = item
+            self._log("INFO", f"[batch {i}] Generating post with Gemini...")
+            return (i, downloaded) + self._ai_generate(downloaded)
+
+        def build(item: Tuple[int, List[DriveImage], Dict[str, Any], str]) -> Tuple[List[DriveImage], BuildResult]:
+            i, downloaded, captions, post_text = item
+            build_result = self._build_post(downloaded, captions, post_text)
+            # 만든 글은 바로 체크포인트에 기록(빌드 단계는 워커 1개라 동시 쓰기 없음)
+            posts = cp.get("posts", []) + [{"images": self._images_to_checkpoint(downloaded), "build": asdict(build_result)}]
+            cp.save("posts", posts)
+            return downloaded, build_result
+
+        return [
+            Stage("download", download, **opts("download")),
+            Stage("resize", resize, **opts("resize")),
+            Stage("ai", generate, **opts("ai", workers=2)),
+            Stage("build", build, workers=1, queue_size=opts("build")["queue_size"]),  # slug/posts.json 때문에 항상 1개씩
+        ]
+
+    def _resume_incomplete(self) -> Optional[PipelineResult]:
+        """다른 프로세스가 실행 중이면 건너뛰고, 중간에 실패한 이전 실행이 있으면 그 체크포인트부터 마저 진행 (둘 다 없으면 None)"""
+        active = self.checkpoints.active_elsewhere()
+        if active is not None:
+            self._log("INFO", f"Run {active.run_id} is in progress in another process (pid {active.data.get('pid')}); skipping this run")
+            return PipelineResult(ok=True, message="Another run is in progress.", processed_count=0)
+        if not self.resume:
+            return None
+        cp = self.checkpoints.claim_incomplete()
+        if cp is None:
+            return None
+        self._log("INFO", f"Resuming run {cp.run_id} (attempt {cp.attempts}, {cp.mode}, completed stages: {list(cp.data.get('stages', {}))})...")
+        if cp.mode == "drain":
+            if not cp.get("posts"):
+                cp.complete()  # 완성된 글이 없으면 이어갈 것도 없음 → 새로 실행
+                return None
+            return self._finish_drain(cp, errors=[], started=time.monotonic())
+        return self._run_single(cp)
+
+    def _run_single(self, cp: Optional[RunCheckpoint]) -> PipelineResult:
+        """배치 1개 → 글 1개. 단계가 끝날 때마다 체크포인트에 기록하고, 이미 끝난 단계는 건너뜀"""
+        errors: List[str] = []
         downloaded: List[DriveImage] = []
         build_result: Optional[BuildResult] = None
+        self._prompt = None
 
         try:
-            downloaded = self._pick_and_download()
-            if not downloaded:
-                return PipelineResult(ok=True, message="No new images.", processed_count=0)
-
-            self._resize_images(downloaded)
-
-            captions, post_text = self._ai_generate(downloaded)
-            build_result = self._build_content(captions, post_text, downloaded)
-            
-            # 메타데이터 업데이트 (제목 추출 로직 포함)
-            title = post_text.splitlines()[0].strip("# ")
-            self._update_posts_metadata(build_result, title)
+            # 1) 다운로드
+            if cp is not None and cp.has("download"):
+                downloaded = self._images_from_checkpoint(cp.get("download"))
+                missing = [img for img in downloaded if not (img.local_path and Path(img.local_path).exists())]
+                if missing:
+                    self._log("INFO", f"Re-downloading {len(missing)} missing file(s) from checkpoint...")
+                    self.drive_manager.download_images(missing, subdir="incoming")
+            else:
+                downloaded = self._pick_and_download()
+                if not downloaded:
+                    self._record_pending()
+                    return PipelineResult(ok=True, message="No new images.", processed_count=0)
+                cp = self.checkpoints.new_run("single")
+                cp.save("download", self._images_to_checkpoint(downloaded))
+
+            # 2) 리사이즈 (결과 파일이 남아 있을 때만 재사용)
+            resized = self._images_from_checkpoint(cp.get("resize", []))
+            if resized and all(img.resized_path and Path(img.resized_path).exists() for img in resized):
+                downloaded = resized
+            else:
+                self._resize_images(downloaded)
+                cp.save("resize", self._images_to_checkpoint(downloaded))
+
+            # 3) AI 생성
+            if cp.has("ai"):
+                captions, post_text = cp.get("ai")["captions"], cp.get("ai")["post_text"]
+            else:
+                captions, post_text = self._ai_generate(downloaded)
+                cp.save("ai", {"captions": captions, "post_text": post_text})
+
+            # 4) 빌드 (이미 만든 글 파일이 있으면 그대로 사용 → 중복 글 방지)
+            if cp.has("build") and Path(cp.get("build")["post_path"]).exists():
+                build_result = BuildResult(**cp.get("build"))
+                self._log("INFO", f"Reusing built post from checkpoint: {build_result.post_path}")
+            else:
+                build_result = self._build_post(downloaded, captions, post_text)
+                cp.save("build", asdict(build_result))
+
+            # 5) Git 배포
+            if not cp.has("publish"):
+                self._git_publish([build_result.post_slug])
+                cp.save("publish", {"slugs": [build_result.post_slug]})
+
+            # 6) 구글 드라이브 상태 업데이트 (여기서 아까 에러났던 부분!)
+            marked = self._update_state([(downloaded, build_result.post_slug)])
+            if marked is None:
+                raise RuntimeError("Post published but state update failed; it will be retried on the next run")
+            cp.complete()
+            self.checkpoints.cleanup()
+            self._cleanup_local(downloaded)
+            self._record_pending(marked)
 
-            # Git 배포
-            self._git_publish(build_result)
-
-            # 구글 드라이브 상태 업데이트 (여기서 아까 에러났던 부분!)
-            marked = self._update_state(downloaded, build_result.post_slug)
-            
             return PipelineResult(
                 ok=True,
                 message="Pipeline completed successfully.",
-                processed_count=marked,
+                processed_count=len(downloaded),
                 post_path=build_result.post_path,
                 post_slug=build_result.post_slug,
                 errors=None,
@@ -222,6 +378,9 @@ class Pipeline:
             errors.append(err_msg)
             self._log("ERROR", err_msg)
             self._log("ERROR", traceback.format_exc())
+            if cp is not None:
+                cp.fail(err_msg)
+                self._log("INFO", f"Checkpoint kept for resume: {cp.path}")
             return PipelineResult(
                 ok=False,
                 message="Pipeline failed.",
@@ -231,7 +390,137 @@ class Pipeline:
                 errors=errors,
             )
 
-def run_pipeline() -> PipelineResult:
-    cfg = load_config()
+    def run(self) -> PipelineResult:
+        try:
+            self._preflight_security_checks()
+        except Exception as e:
+            return PipelineResult(ok=False, message=str(e), errors=[str(e)])
+
+        self.drive_manager.last_pending_count = None  # watch 모드에서 이전 주기의 스캔 결과를 쓰지 않도록
+        resumed = self._resume_incomplete()
+        if resumed is not None:
+            return resumed
+        return self._run_single(None)
+
+    def _finish_drain(self, cp: RunCheckpoint, errors: List[str], started: float) -> PipelineResult:
+        """체크포인트에 기록된 글들을 커밋 1개로 발행하고 state를 1회 기록"""
+        published: List[Tuple[List[DriveImage], BuildResult]] = []
+        for post in cp.get("posts", []):
+            build_result = BuildResult(**post["build"])
+            if Path(build_result.post_path).exists():
+                published.append((self._images_from_checkpoint(post["images"]), build_result))
+        if not published:
+            cp.fail("no post was built")
+            return PipelineResult(ok=False, message="Pipeline failed: no post was built.", errors=errors)
+
+        slugs = [build.post_slug for _, build in published]
+        if not cp.has("publish"):
+            try:
+                self._git_publish(slugs)
+            except Exception as e:
+                err_msg = f"{type(e).__name__}: {e}"
+                self._log("ERROR", err_msg)
+                cp.fail(err_msg)
+                return PipelineResult(ok=False, message="Pipeline failed.", errors=errors + [err_msg], post_slugs=slugs)
+            cp.save("publish", {"slugs": slugs})
+
+        marked = self._update_state([(images, build.post_slug) for images, build in published])
+        if marked is None:
+            err_msg = "Posts published but state update failed; it will be retried on the next run"
+            cp.fail(err_msg)
+            return PipelineResult(ok=False, message="Pipeline failed.", errors=errors + [err_msg], post_slugs=slugs)
+        cp.complete()
+        self.checkpoints.cleanup()
+        self._cleanup_local([img for images, _ in published for img in images])
+        self._record_pending(marked)
+
+        last = published[-1][1]
+        return PipelineResult(
+            ok=not errors,
+            message=f"Drained {len(published)} post(s) in {time.monotonic() - started:.0f}s.",
+            processed_count=sum(len(images) for images, _ in published),
+            post_path=last.post_path,
+            post_slug=last.post_slug,
+            errors=errors or None,
+            post_slugs=slugs,
+        )
+
+    def run_drain(self, max_posts: Optional[int] = None, max_seconds: Optional[float] = None) -> PipelineResult:
+        """밀린 이미지를 배치 단위로 계속 처리 (글 수/시간 예산까지), 발행과 state 기록은 마지막에 1회"""
+        drain_cfg = self.config.get("pipeline", {}).get("drain", {})
+        max_posts = int(max_posts if max_posts is not None else drain_cfg.get("max_posts", 10))
+        max_seconds = float(max_seconds if max_seconds is not None else drain_cfg.get("max_seconds", 1800))
+
+        try:
+            self._preflight_security_checks()
+        except Exception as e:
+            return PipelineResult(ok=False, message=str(e), errors=[str(e)])
+
+        self.drive_manager.last_pending_count = None  # watch 모드에서 이전 주기의 스캔 결과를 쓰지 않도록
+        resumed = self._resume_incomplete()
+        if resumed is not None:
+            return resumed
+
+        started = time.monotonic()
+        self._prompt = None
+        errors: List[str] = []
+
+        try:
+            self._log("INFO", "Scanning Google Drive for backlog...")
+            batches = self.drive_manager.pick_batches(self.state_client, max_batches=max_posts)
+        except Exception as e:
+            err_msg = f"{type(e).__name__}: {e}"
+            self._log("ERROR", err_msg)
+            return PipelineResult(ok=False, message="Pipeline failed.", errors=[err_msg])
+        if not batches:
+            self._log("INFO", "No new images found. Nothing to do.")
+            self._record_pending()
+            return PipelineResult(ok=True, message="No new images.", processed_count=0)
+        self._log("INFO", f"Backlog: {sum(len(b) for b in batches)} image(s) in {len(batches)} batch(es) (max_posts={max_posts})")
+
+        # 드라이브 프롬프트는 단계 스레드들이 Drive http를 나눠 쓰기 전에 미리 로드
+        try:
+            self._load_prompt()
+        except Exception as e:
+            err_msg = f"{type(e).__name__}: {e}"
+            self._log("ERROR", err_msg)
+            return PipelineResult(ok=False, message="Pipeline failed.", errors=[err_msg])
+
+        def over_budget() -> bool:
+            elapsed = time.monotonic() - started
+            if max_seconds > 0 and elapsed >= max_seconds:
+                self._log("WARN", f"Time budget reached ({elapsed:.0f}s); remaining batches are left for the next run")
+                return True
+            return False
+
+        # 배치 N이 Gemini를 기다리는 동안 N+1은 다운로드/리사이즈 (단계 사이 큐가 차면 앞 단계가 대기)
+        cp = self.checkpoints.new_run("drain")
+        executor = StageExecutor(self._drain_stages(cp), stop=over_budget, abort_on=(CircuitOpenError,))
+        for res in executor.run(enumerate(batches, 1)):
+            if res.ok:
+                continue
+            # 실패한 배치는 state에 기록하지 않으므로 다음 실행에서 다시 시도된다
+            err_msg = f"Batch {res.index + 1} ({res.failed_stage}): {type(res.error).__name__}: {res.error}"
+            errors.append(err_msg)
+            self._log("ERROR", err_msg)
+            if res.traceback:
+                self._log("ERROR", res.traceback)
+
+        return self._finish_drain(cp, errors, started)
+
+def run_pipeline(
+    drain: Optional[bool] = None,
+    max_posts: Optional[int] = None,
+    max_seconds: Optional[float] = None,
+    resume: Optional[bool] = None,
+    config: Optional[Dict[str, Any]] = None,
+) -> PipelineResult:
+    cfg = config or load_config()
     p = Pipeline(cfg)
+    if resume is not None:
+        p.resume = resume
+    if drain is None:
+        drain = bool(cfg.get("pipeline", {}).get("drain", {}).get("enabled", False))
+    if drain:
+        return p.run_drain(max_posts=max_posts, max_seconds=max_seconds)
     return p.run()
\ No newline at end of file
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.checkpoint import create_checkpoint_store
+from app.drive_client import DEFAULT_SCAN_MODE, load_credentials  # google 라이브러리는 함수 안에서만 로드
+
+DRIVE_CHANGES_URL = "https://www.googleapis.com/drive/v3/changes"
+IMAGE_MIME_PREFIX = "image/"
+
+
+def _poll_changes(session: Any, page_token: str, folder_id: str, known_ids: Set[str]) -> Tuple[bool, str]:
+    """Drive REST changes 조회(googleapiclient 없이). 입력 폴더 이미지 추가/수정 또는 알던 파일 삭제가 있으면 True"""
+    while True:
+        r = session.get(
+            DRIVE_CHANGES_URL,
+            params={
+                "pageToken": page_token,
+                "spaces": "drive",
+                "pageSize": 1000,
+                "fields": "nextPageToken,newStartPageToken,changes(fileId,removed,file(mimeType,parents,trashed))",
+            },
+            timeout=30,
+        )
+        r.raise_for_status()
+        data = r.json()
+        for ch in data.get("changes", []):
+            f = ch.get("file") or {}
+            if ch.get("fileId") in known_ids:
+                return True, page_token  # 스캔 캐시의 목록이 바뀜 → 파이프라인이 직접 반영
+            if not ch.get("removed") and not f.get("trashed") and folder_id in (f.get("parents") or []) \
+                    and f.get("mimeType", "").startswith(IMAGE_MIME_PREFIX):
+                return True, page_token
+        if data.get("newStartPageToken"):
+            return False, data["newStartPageToken"]
+        page_token = data["nextPageToken"]
+
+
+def precheck(config: Dict[str, Any], resume: bool = True) -> Optional[bool]:
+    """가벼운 import만으로 할 일이 있는지 판단
+
+    True: 할 일 있음 / False: 확실히 없음(파이프라인 생략 가능) / None: 판단 불가(그냥 전체 실행)
+    """
+    base_dir = Path(__file__).resolve().parent.parent
+    pipeline_cfg = config.get("pipeline", {})
+    drive_cfg = config.get("drive", {})
+
+    # 1) 중간에 실패한 실행이 있으면 이어가야 함
+    if resume and pipeline_cfg.get("resume", True):
+        if create_checkpoint_store(config).latest_incomplete() is not None:
+            return True
+
+    # 2) 지난 실행이 남긴 스캔 캐시(목록 + changes 커서 + 남은 미처리 수)
+    if drive_cfg.get("scan_mode", DEFAULT_SCAN_MODE) != "incremental":  # full 모드는 스캔 캐시를 유지하지 않음
+        return None
+    cache_path = base_dir / config.get("project", {}).get("cache_dir", ".cache") / "drive_scan.json"
+    try:
+        cache = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    folder_id = drive_cfg.get("input_folder_id")
+    if not folder_id or cache.get("folder_id") != folder_id or not cache.get("page_token") or "pending" not in cache:
+        return None
+    if int(cache["pending"]) > 0:
+        return True
+
+    # 3) 그 뒤로 Drive에 변경이 있었는지 (REST changes 1회, google-auth만 사용)
+    from google.auth.transport.requests import AuthorizedSession
+
+    session = AuthorizedSession(load_credentials())
+    try:
+        changed, page_token = _poll_changes(session, cache["page_token"], folder_id, {f["file_id"] for f in cache.get("files", [])})
+    finally:
+        session.close()
+    if changed:
+        return True
+
+    # 관련 없는 변경만 있었으면 커서를 앞으로 옮겨 다음 확인을 가볍게 유지
+    if page_token != cache["page_token"]:
+        cache["page_token"] = page_token
+        tmp = cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(cache, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(cache_path)
+    return False
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+# 템플릿별로 반드시 들어 있어야 하는 문구(응답 형식이 바뀌면 파싱이 깨지므로 로드 시점에 확인)
+REQUIRED_MARKERS: Dict[str, Tuple[str, ...]] = {
+    "photo_captions.txt": ("JSON", "images"),
+    "post_fused.txt": ("JSON", "images", "post_markdown", "[[IMAGE_N]]"),
+}
+
+
+def compact_json(data: Any) -> str:
+    """프롬프트에 넣는 입력 데이터 직렬화(들여쓰기/공백 없이 → 입력 토큰 절약)"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+@dataclass
+class PromptRegistry:
+    """prompts/ 템플릿을 한 번 읽어 검증 후 메모리에 보관 (파일 mtime이 바뀌면 다시 읽음)"""
+
+    prompts_dir: Path
+    markers: Dict[str, Tuple[str, ...]] = field(default_factory=lambda: dict(REQUIRED_MARKERS))
+    _cache: Dict[str, Tuple[int, str]] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def _validate(self, name: str, text: str) -> str:
+        text = text.lstrip("﻿").strip()
+        if not text:
+            raise ValueError(f"Prompt template is empty: {self.prompts_dir / name}")
+        missing = [m for m in self.markers.get(name, ()) if m not in text]
+        if missing:
+            raise ValueError(f"Prompt template {name} is missing required text: {missing}")
+        return text
+
+    def get(self, name: str) -> str:
+        path = self.prompts_dir / name
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Missing prompt file: {path}")
+
+        with self._lock:
+            hit = self._cache.get(name)
+            if hit is not None and hit[0] == mtime:
+                return hit[1]
+            text = self._validate(name, path.read_text(encoding="utf-8"))
+            self._cache[name] = (mtime, text)
+            return text
+
+    def preload(self, *names: str) -> None:
+        """시작 시 템플릿을 미리 읽어 누락/형식 오류를 첫 API 호출 전에 드러냄"""
+        for name in names:
+            self.get(name)
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+@dataclass
+class TokenBucket:
+    """요청 수(RPM)와 토큰 수(TPM)를 함께 제한하는 토큰 버킷 (스레드 안전, acquire는 블로킹)"""
+
+    rpm: float = 10.0
+    tpm: float = 250_000.0
+    _req_level: Optional[float] = field(default=None, init=False, repr=False)
+    _tok_level: Optional[float] = field(default=None, init=False, repr=False)
+    _last: float = field(default_factory=time.monotonic, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def _refill(self, now: float) -> None:
+        if self._req_level is None:
+            self._req_level, self._tok_level = float(self.rpm), float(self.tpm)  # 처음엔 가득 찬 상태
+        elapsed = now - self._last
+        self._last = now
+        self._req_level = min(float(self.rpm), self._req_level + elapsed * self.rpm / 60.0)
+        self._tok_level = min(float(self.tpm), self._tok_level + elapsed * self.tpm / 60.0)
+
+    def acquire(self, tokens: int = 0) -> float:
+        """요청 1건 + tokens개를 쓸 수 있을 때까지 대기. 대기한 시간(초) 반환"""
+        tokens = min(max(0, tokens), int(self.tpm)) if self.tpm > 0 else 0  # 한도보다 큰 요청은 한도까지만
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                need_req = 0.0 if self.rpm <= 0 else max(0.0, 1.0 - self._req_level) * 60.0 / self.rpm
+                need_tok = 0.0 if self.tpm <= 0 else max(0.0, tokens - self._tok_level) * 60.0 / self.tpm
+                wait = max(need_req, need_tok)
+                if wait <= 0:
+                    if self.rpm > 0:
+                        self._req_level -= 1.0
+                    if self.tpm > 0:
+                        self._tok_level -= tokens
+                    return waited
+            time.sleep(wait)
+            waited += wait
+
+
+class CircuitOpenError(RuntimeError):
+    """연속 실패로 회로가 열려 있는 동안 호출을 즉시 거부"""
+
+
+@dataclass
+class RateLimitStats:
+    requests: int = 0  # 실제로 보낸 요청 수(재시도 포함)
+    throttled: int = 0  # 429 응답 수
+    retries: int = 0  # 재시도 횟수(429/5xx/연결 오류)
+    quota_wait_seconds: float = 0.0  # 토큰 버킷 대기 시간
+    backoff_seconds: float = 0.0  # Retry-After/백오프 대기 시간
+    circuit_opens: int = 0
+    client_errors: int = 0  # 재시도하지 않는 오류 응답(400/401/403/404 등) - 속도/회로 상태는 건드리지 않음
+
+    def as_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d["throttle_seconds"] = round(self.quota_wait_seconds + self.backoff_seconds, 2)
+        return d
+
+
+def _retry_after_seconds(resp: Any) -> Optional[float]:
+    """Retry-After 헤더(초 또는 HTTP-date) → 없으면 Google RetryInfo(retryDelay: "23s")"""
+    value = (getattr(resp, "headers", None) or {}).get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    try:
+        details = resp.json().get("error", {}).get("details", [])
+    except Exception:
+        return None
+    for d in details:
+        delay = str(d.get("retryDelay", "")) if isinstance(d, dict) else ""
+        if delay.endswith("s"):
+            try:
+                return max(0.0, float(delay[:-1]))
+            except ValueError:
+                continue
+    return None
+
+
+@dataclass
+class AdaptiveRateLimiter(TokenBucket):
+    """모든 Gemini 호출이 거치는 공통 재시도/쿼터 계층
+
+    - 토큰 버킷(RPM/TPM) 안에서만 전송
+    - 429/5xx/연결 오류는 Retry-After(없으면 지수 백오프)만큼 쉬고 재시도
+    - AIMD: 2xx면 RPM을 조금씩 올리고(additive), 429면 절반으로(multiplicative), 그 밖의 4xx는 그대로
+    - 연속 실패가 쌓이면 cooldown 동안 회로를 열어 바로 실패시킴
+    """
+
+    min_rpm: float = 1.0
+    max_rpm: Optional[float] = None  # None이면 처음 rpm이 상한
+    increase_step: float = 0.5
+    decrease_factor: float = 0.5
+    max_attempts: int = 5
+    base_backoff: float = 1.0
+    max_backoff: float = 60.0
+    failure_threshold: int = 5
+    cooldown_seconds: float = 120.0
+    retry_statuses: Tuple[int, ...] = (429, 500, 502, 503, 504)
+    stats: RateLimitStats = field(default_factory=RateLimitStats)
+    _consecutive_failures: int = field(default=0, init=False, repr=False)
+    _open_until: float = field(default=0.0, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.max_rpm is None:
+            self.max_rpm = float(self.rpm)
+
+    def _check_circuit(self) -> None:
+        with self._lock:
+            remaining = self._open_until - time.monotonic()
+        if remaining > 0:
+            raise CircuitOpenError(f"Gemini circuit open after repeated failures; retry in {remaining:.0f}s")
+
+    def _on_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._open_until = 0.0
+            self.rpm = min(float(self.max_rpm), self.rpm + self.increase_step)
+
+    def _on_failure(self, throttled: bool) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            self.stats.retries += 1
+            if throttled:
+                self.stats.throttled += 1
+                self.rpm = max(self.min_rpm, self.rpm * self.decrease_factor)
+            if self._consecutive_failures >= self.failure_threshold:
+                self._open_until = time.monotonic() + self.cooldown_seconds
+                self._consecutive_failures = 0
+                self.stats.circuit_opens += 1
+
+    def _backoff(self, attempt: int, resp: Any = None) -> float:
+        delay = _retry_after_seconds(resp) if resp is not None else None
+        if delay is None:
+            delay = self.base_backoff * (2 ** attempt) + random.uniform(0.0, self.base_backoff)
+        return min(delay, self.max_backoff)
+
+    def call(self, send: Callable[[], Any], tokens: int = 0, use_quota: bool = True) -> Any:
+        """send()를 쿼터/재시도/회로 차단 규칙에 따라 실행하고 마지막 응답 반환"""
+        last_error: Optional[BaseException] = None
+        resp: Any = None
+        for attempt in range(max(1, self.max_attempts)):
+            self._check_circuit()
+            if use_quota:
+                self.stats.quota_wait_seconds += self.acquire(tokens)
+            self.stats.requests += 1
+            try:
+                resp = send()
+            except OSError as e:  # requests의 연결/타임아웃 오류도 OSError 계열
+                last_error, resp = e, None
+                self._on_failure(throttled=False)
+                delay = self._backoff(attempt)
+                print(f"[WARN] Gemini request error: {e}. retry in {delay:.1f}s...")
+            else:
+                status = getattr(resp, "status_code", 200)
+                if status not in self.retry_statuses:
+                    if 200 <= status < 300:  # 성공 응답만 RPM을 올리고 회로를 닫는다
+                        self._on_success()
+                    else:  # 클라이언트 오류는 쿼터 신호가 아니므로 그대로 반환
+                        with self._lock:
+                            self.stats.client_errors += 1
+                    return resp
+                self._on_failure(throttled=status == 429)
+                delay = self._backoff(attempt, resp)
+                print(f"[WARN] Gemini {status}. retry in {delay:.1f}s (rpm={self.rpm:.1f})...")
+            if attempt + 1 < self.max_attempts:
+                self.stats.backoff_seconds += delay
+                time.sleep(delay)
+
+        if resp is not None:
+            return resp  # 호출부가 상태 코드로 에러 메시지를 만든다
+        raise RuntimeError(f"Gemini request failed after {self.max_attempts} attempts: {last_error}")
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import queue
+import threading
+import traceback
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, List, Optional, Tuple, Type
+
+_DONE = object()  # 단계 종료 신호
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1  # 이 단계를 동시에 처리하는 스레드 수
+    queue_size: int = 1  # 이 단계 앞 대기열 크기(가득 차면 앞 단계가 기다림 = backpressure)
+
+
+@dataclass
+class StageResult:
+    index: int
+    value: Any = None
+    error: Optional[BaseException] = None
+    failed_stage: Optional[str] = None
+    traceback: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class StageAborted(RuntimeError):
+    """abort_on 예외가 난 뒤 아직 처리되지 않은 항목"""
+
+
+@dataclass
+class StageExecutor:
+    """항목들을 단계(stage) 파이프라인으로 흘려보내는 실행기
+
+    단계 사이에는 크기 제한 큐가 있어 느린 단계 앞에서 앞 단계가 멈추고(backpressure),
+    서로 다른 항목의 단계들이 겹쳐 실행된다(항목 N이 AI를 기다리는 동안 N+1은 다운로드/리사이즈).
+    어떤 단계에서 실패한 항목은 이후 단계를 건너뛰고 실패 결과로 나온다.
+    """
+
+    stages: List[Stage]
+    stop: Optional[Callable[[], bool]] = None  # True를 반환하면 새 항목 투입 중단(시간 예산 등)
+    abort_on: Tuple[Type[BaseException], ...] = ()  # 이 예외가 나면 남은 항목은 처리하지 않음
+    _aborted: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    _workers: List[int] = field(default_factory=list, init=False, repr=False)
+    _fatal: Optional[BaseException] = field(default=None, init=False, repr=False)  # 단계에서 난 SystemExit/KeyboardInterrupt 등
+
+    def _worker(self, k: int, q_in: "queue.Queue[Any]", q_out: "queue.Queue[Any]", remaining: List[int], lock: threading.Lock) -> None:
+        stage = self.stages[k]
+        while True:
+            item = q_in.get()
+            if item is _DONE:
+                with lock:
+                    remaining[k] -= 1
+                    last = remaining[k] == 0
+                if last:  # 이 단계의 마지막 워커가 끝나면 다음 단계 워커 수만큼 종료 신호 전달
+                    n_next = self._workers[k + 1] if k + 1 < len(self.stages) else 1
+                    for _ in range(n_next):
+                        q_out.put(_DONE)
+                return
+
+            res: StageResult = item
+            if res.ok and self._aborted.is_set():
+                res.error, res.failed_stage = StageAborted("aborted before this stage"), stage.name
+            elif res.ok:
+                try:
+                    res.value = stage.fn(res.value)
+                except Exception as e:
+                    res.error, res.failed_stage, res.traceback = e, stage.name, traceback.format_exc()
+                    if self.abort_on and isinstance(e, self.abort_on):
+                        self._aborted.set()
+                except BaseException as e:  # 워커가 그냥 죽으면 종료 신호가 안 넘어가 run()이 영원히 대기 → 기록 후 run()에서 다시 raise
+                    res.error, res.failed_stage, res.traceback = e, stage.name, traceback.format_exc()
+                    with lock:
+                        self._fatal = self._fatal or e
+                    self._aborted.set()
+            q_out.put(res)
+
+    def run(self, items: Iterable[Any]) -> List[StageResult]:
+        """모든 항목을 처리하고 투입 순서대로 결과 반환(stop으로 투입되지 않은 항목은 결과에 없음)"""
+        if not self.stages:
+            return [StageResult(index=i, value=v) for i, v in enumerate(items)]
+
+        queues = [queue.Queue(maxsize=max(1, s.queue_size)) for s in self.stages]
+        out: "queue.Queue[Any]" = queue.Queue()
+        self._aborted.clear()
+        self._fatal = None
+        self._workers = [max(1, s.workers) for s in self.stages]
+        remaining = list(self._workers)
+        lock = threading.Lock()
+
+        threads: List[threading.Thread] = []
+        for k, s in enumerate(self.stages):
+            q_out = queues[k + 1] if k + 1 < len(self.stages) else out
+            for w in range(self._workers[k]):
+                t = threading.Thread(
+                    target=self._worker,
+                    args=(k, queues[k], q_out, remaining, lock),
+                    name=f"stage-{s.name}-{w}",
+                    daemon=True,
+                )
+                t.start()
+                threads.append(t)
+
+        # 첫 단계 큐가 가득 차면 put이 막힘 → 항목을 미리 잔뜩 꺼내 두지 않음
+        for i, value in enumerate(items):
+            if self._aborted.is_set() or (self.stop is not None and self.stop()):
+                break
+            queues[0].put(StageResult(index=i, value=value))
+        for _ in range(self._workers[0]):
+            queues[0].put(_DONE)
+
+        results: List[StageResult] = []
+        while True:
+            item = out.get()
+            if item is _DONE:
+                break
+            results.append(item)
+        for t in threads:
+            t.join()
+        if self._fatal is not None:
+            raise self._fatal
+        return sorted(results, key=lambda r: r.index)
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+TARGET_MODULES = ["app.main", "app.precheck", "app.config_loader"]  # 시작 경로(run 진입 + precheck)에서 import하는 모듈
+HEAVY_MODULES = ["PIL", "googleapiclient", "google_auth_oauthlib", "httplib2", "requests"]  # 실제 단계 전까지 로드되면 안 되는 모듈
+
+_PROBE = (
+    "import json, sys\n"
+    "import {modules}\n"
+    "print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))\n"
+)
+
+
+def _probe(modules: List[str]) -> Tuple[Dict[str, int], List[str]]:
+    """새 인터프리터에서 import 1회. (모듈별 누적 import 시간 µs, 로드된 무거운 모듈)"""
+    code = _PROBE.format(modules=", ".join(modules), heavy=HEAVY_MODULES)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=str(BASE_DIR),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import probe failed:\n{proc.stderr[-2000:]}")
+
+    cumulative: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        # "import time:      self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if len(parts) != 3 or not parts[1].isdigit():
+            continue
+        cumulative[parts[2].strip()] = int(parts[1])
+    return cumulative, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_bench(runs: int = 5, top: int = 10) -> Dict[str, Any]:
+    totals: List[int] = []
+    per_module: Dict[str, List[int]] = {}
+    heavy: Dict[str, List[str]] = {}
+    for _ in range(runs):
+        cumulative, loaded = _probe(TARGET_MODULES)
+        totals.append(sum(cumulative.get(m, 0) for m in TARGET_MODULES))
+        for name, us in cumulative.items():
+            per_module.setdefault(name, []).append(us)
+        if loaded:
+            heavy[" ".join(TARGET_MODULES)] = loaded
+
+    # 파이프라인 모듈 자체도 import만으로는 무거운 라이브러리를 끌어오지 않아야 함(단계에서 지연 로드)
+    _, loaded = _probe(["app.pipeline"])
+    if loaded:
+        heavy["app.pipeline"] = loaded
+
+    slowest = sorted(((statistics.median(v), k) for k, v in per_module.items()), reverse=True)[:top]
+    return {
+        "median_ms": statistics.median(totals) / 1000.0,
+        "slowest": [(name, us / 1000.0) for us, name in slowest],
+        "heavy": heavy,
+    }
+
+
+def _default_budget_ms() -> float:
+    from app.config_loader import load_config
+
+    return float(load_config().get("startup", {}).get("budget_ms", 150))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cold-start import time check for the app entry point")
+    parser.add_argument("--budget-ms", type=float, default=None, help="허용 import 시간(중앙값, ms). 기본: config startup.budget_ms")
+    parser.add_argument("--runs", type=int, default=5, help="새 프로세스로 측정할 횟수")
+    parser.add_argument("--top", type=int, default=10, help="출력할 느린 import 수")
+    args = parser.parse_args()
+
+    budget_ms = args.budget_ms if args.budget_ms is not None else _default_budget_ms()
+    report = run_bench(runs=max(1, args.runs), top=args.top)
+
+    print(f"Startup imports ({', '.join(TARGET_MODULES)}): median {report['median_ms']:.1f} ms over {args.runs} runs (budget {budget_ms:.0f} ms)")
+    print("Slowest imports (cumulative):")
+    for name, ms in report["slowest"]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    ok = True
+    if report["median_ms"] > budget_ms:
+        print(f"FAIL: cold start {report['median_ms']:.1f} ms exceeds budget {budget_ms:.0f} ms")
+        ok = False
+    for entry, loaded in report["heavy"].items():
+        print(f"FAIL: importing {entry} loads heavy modules: {', '.join(loaded)}")
+        ok = False
+    if ok:
+        print("OK")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,236 @@
+from __future__ import annotations  # 타입 힌트 안정화
+import json  # state/delta 직렬화
+import secrets  # delta 파일명 충돌 방지용 랜덤 접미사
+from abc import ABC, abstractmethod  # 저장소 기본 연산은 하위 클래스가 반드시 구현
+from dataclasses import dataclass, field  # 간단한 데이터 구조용
+from datetime import datetime, timezone  # delta 파일명 타임스탬프
+from io import BytesIO  # Drive 다운로드/업로드 버퍼
+from pathlib import Path  # 로컬 백엔드 경로
+from typing import Any, Dict, List, Optional, Tuple  # 타입 힌트
+
+
+EMPTY_STATE: Dict[str, Any] = {"version": 1, "processed": []}  # 최소 state 구조
+
+
+@dataclass
+class LogEntry:  # 스냅샷 또는 delta 파일 1개
+    name: str  # 파일명(state.json / state.snapshot-*.json / state.delta-*.json)
+    key: str  # 백엔드별 식별자(Drive file_id 또는 로컬 경로)
+    version: str = ""  # 변경 감지 토큰(Drive version / 로컬 mtime)
+
+
+def _dumps_compact(state: Dict[str, Any]) -> bytes:  # 공백 없는 JSON bytes
+    return json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")  # indent 없이 직렬화
+
+
+def _parse_state(data: bytes, name: str) -> Dict[str, Any]:  # bytes -> 검증된 state dict
+    state = json.loads(data.decode("utf-8"))  # JSON -> dict
+    if "processed" not in state or not isinstance(state["processed"], list):  # 필수 구조 검증
+        raise ValueError(f"Invalid {name}: missing 'processed' list")  # 구조가 이상하면 에러
+    state.setdefault("version", 1)  # version 없으면 기본 추가
+    return state  # state dict 반환
+
+
+@dataclass
+class LogStateBackend(ABC):  # 불변 스냅샷 + append-only delta 파일들로 state를 저장하는 공통 로직
+    """state = 모든 스냅샷 파일 ∪ 모든 delta 파일
+
+    파일은 한 번 만들면 덮어쓰지 않는다. 압축은 읽은 스냅샷/delta를 전부 합친 새 스냅샷을 만든 뒤
+    방금 읽은 파일만 삭제하므로, 두 실행이 동시에 압축해도 어떤 기록도 사라지지 않는다
+    (삭제되는 파일의 내용은 항상 삭제한 쪽이 새로 만든 스냅샷에 들어 있다).
+    """
+
+    state_file_name: str = "state.json"  # 기존(단일) 스냅샷 파일명 - 읽기만 하고 압축 때 새 스냅샷으로 대체
+    _delta_cache: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict, init=False, repr=False)  # delta는 불변이므로 key별 캐시
+    _snapshot_cache: Dict[str, Dict[str, Any]] = field(default_factory=dict, init=False, repr=False)  # "key@version" -> 스냅샷
+
+    # --- 하위 클래스가 구현하는 저장소 기본 연산 ---
+    @abstractmethod
+    def _list_entries(self) -> List[LogEntry]:  # 스냅샷 + delta 파일 목록(1회 조회)
+        ...
+
+    @abstractmethod
+    def _read(self, entry: LogEntry) -> bytes:  # 파일 내용 읽기
+        ...
+
+    @abstractmethod
+    def _create(self, name: str, data: bytes) -> LogEntry:  # 새 파일 생성
+        ...
+
+    @abstractmethod
+    def _delete(self, entry: LogEntry) -> None:  # 파일 삭제(이미 없으면 성공으로 취급)
+        ...
+
+    # --- 공통 로직 ---
+    @property
+    def delta_prefix(self) -> str:  # 예: state.json -> state.delta-
+        return f"{Path(self.state_file_name).stem}.delta-"  # delta 파일명 접두사
+
+    @property
+    def snapshot_prefix(self) -> str:  # 예: state.json -> state.snapshot-
+        return f"{Path(self.state_file_name).stem}.snapshot-"  # 압축 스냅샷 파일명 접두사
+
+    def _new_name(self, prefix: str) -> str:  # 정렬 가능한 타임스탬프 + 동시 실행끼리 이름 충돌 방지
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")  # 시간순 정렬용
+        return f"{prefix}{stamp}-{secrets.token_hex(3)}.json"  # 파일명
+
+    def _split(self, entries: List[LogEntry]) -> Tuple[List[LogEntry], List[LogEntry]]:  # 스냅샷/delta 분리(각각 시간순)
+        snapshots = sorted(  # 기존 state.json이 가장 오래된 스냅샷
+            (e for e in entries if e.name == self.state_file_name or e.name.startswith(self.snapshot_prefix)),
+            key=lambda e: (e.name != self.state_file_name, e.name),
+        )
+        deltas = sorted((e for e in entries if e.name.startswith(self.delta_prefix)), key=lambda e: e.name)  # 시간순 delta
+        return snapshots, deltas  # 튜플 반환
+
+    def _fingerprint(self, entries: List[LogEntry]) -> str:  # 목록으로 변경 감지 토큰 계산
+        return "|".join(f"{e.name}@{e.version}" for e in sorted(entries, key=lambda e: e.name))  # 이름+version 조합
+
+    def fingerprint(self) -> str:  # 본문 다운로드 없이 현재 토큰만 조회
+        return self._fingerprint(self._list_entries())  # 목록 1회 조회
+
+    def _read_snapshot(self, snapshot: LogEntry) -> Dict[str, Any]:  # 스냅샷은 key/version별로 한 번만 읽기
+        cache_key = f"{snapshot.key}@{snapshot.version}"  # 같은 파일·같은 version이면 재사용
+        if cache_key not in self._snapshot_cache:  # 처음 보는 스냅샷이면
+            self._snapshot_cache[cache_key] = _parse_state(self._read(snapshot), snapshot.name)  # 다운로드 + 검증
+        return self._snapshot_cache[cache_key]  # 스냅샷 반환
+
+    def _read_delta(self, delta: LogEntry) -> List[Dict[str, Any]]:  # delta는 한 번만 읽는다
+        if delta.key not in self._delta_cache:  # 처음 보는 delta면
+            self._delta_cache[delta.key] = _parse_state(self._read(delta), delta.name)["processed"]  # 다운로드 후 캐시
+        return self._delta_cache[delta.key]  # 캐시 반환
+
+    def _merge(self, entries: List[LogEntry]) -> Dict[str, Any]:  # 주어진 목록의 스냅샷 + delta 합치기
+        snapshots, deltas = self._split(entries)  # 분리
+        live = {f"{e.key}@{e.version}" for e in snapshots}  # 지금 남아 있는 스냅샷
+        for stale in [k for k in self._snapshot_cache if k not in live]:  # 삭제/대체된 스냅샷 캐시 정리
+            self._snapshot_cache.pop(stale)
+        bases = [self._read_snapshot(e) for e in snapshots]  # 스냅샷(보통 1개)
+        merged: List[Dict[str, Any]] = []  # 합쳐진 processed
+        seen = set()  # file_id 중복 제거(먼저 기록된 것 우선)
+        items = [i for b in bases for i in b["processed"]] + [i for d in deltas for i in self._read_delta(d)]  # 시간순
+        for item in items:  # 순회
+            fid = item.get("file_id")  # file_id
+            if fid in seen:  # 중복이면
+                continue  # 건너뜀
+            seen.add(fid)  # 기록
+            merged.append(item)  # 추가
+        base = bases[-1] if bases else EMPTY_STATE  # 최상위 필드(version 등)는 가장 최근 스냅샷 기준
+        return dict(base, processed=merged)  # state
+
+    def load(self) -> Tuple[Dict[str, Any], str]:  # 스냅샷 + delta를 합친 state와 토큰 반환
+        entries = self._list_entries()  # 목록 1회 조회
+        try:
+            state = self._merge(entries)  # 합치기
+        except Exception:  # 목록 조회 후 다른 실행의 압축으로 파일이 사라졌을 수 있음 → 새 목록으로 1회 재시도
+            entries = self._list_entries()  # 다시 조회
+            state = self._merge(entries)  # 합치기
+        return state, self._fingerprint(entries)  # state, 토큰
+
+    def append(self, items: List[Dict[str, Any]]) -> None:  # 이번 실행분을 작은 delta 파일 1개로 기록
+        name = self._new_name(self.delta_prefix)  # 새 delta 파일명
+        entry = self._create(name, _dumps_compact({"version": 1, "processed": items}))  # 새 파일 생성(덮어쓰기 없음)
+        self._delta_cache[entry.key] = items  # 방금 쓴 내용은 다시 받을 필요 없음
+
+    def delta_count(self) -> int:  # 압축 대상 파일 수(delta + 여분 스냅샷)
+        snapshots, deltas = self._split(self._list_entries())  # 목록 1회 조회
+        return len(deltas) + max(0, len(snapshots) - 1)  # 스냅샷은 1개가 정상
+
+    def compact(self) -> bool:  # 읽은 스냅샷/delta를 새 스냅샷 1개로 합치고, 읽은 파일만 삭제
+        entries = self._list_entries()  # 목록 1회 조회
+        snapshots, deltas = self._split(entries)  # 분리
+        if not deltas and len(snapshots) <= 1:  # 합칠 게 없으면
+            return False  # 생략
+        state = self._merge(entries)  # 이 목록의 전체 내용(캐시 활용)
+        self._create(self._new_name(self.snapshot_prefix), _dumps_compact(state))  # 새 스냅샷(기존 파일은 건드리지 않음)
+        for e in snapshots + deltas:  # 새 스냅샷에 전부 들어간 파일만 삭제(그 사이 새로 생긴 파일은 유지)
+            self._delete(e)  # 삭제(다른 실행이 먼저 지웠으면 무시)
+            self._delta_cache.pop(e.key, None)  # 캐시 정리
+        return True  # 압축 완료
+
+
+@dataclass
+class DriveStateBackend(LogStateBackend):  # Drive 폴더에 스냅샷/delta를 저장
+    drive_service: Any = None  # google drive service 객체
+    state_folder_id: str = ""  # state 파일들이 위치할 Drive 폴더 ID
+
+    def _list_entries(self) -> List[LogEntry]:  # 폴더 내 스냅샷 + delta 목록을 한 번에 조회
+        q = (  # Drive 검색 쿼리 문자열
+            f"'{self.state_folder_id}' in parents and "  # 특정 폴더 안에서
+            f"(name = '{self.state_file_name}' or name contains '{self.snapshot_prefix}' or name contains '{self.delta_prefix}') and "  # 스냅샷 또는 delta
+            "trashed = false"  # 휴지통이 아니면
+        )
+        entries: List[LogEntry] = []  # 결과
+        page_token: Optional[str] = None  # 페이지 토큰
+        while True:  # delta가 많아도 전부 조회
+            resp = self.drive_service.files().list(  # 파일 목록 조회
+                q=q, fields="nextPageToken, files(id, name, version, modifiedTime)", pageSize=1000, pageToken=page_token
+            ).execute()
+            for f in resp.get("files", []):  # 파일 순회
+                entries.append(LogEntry(name=f["name"], key=f["id"], version=f"{f.get('version', '')}:{f.get('modifiedTime', '')}"))  # 엔트리 추가
+            page_token = resp.get("nextPageToken")  # 다음 페이지
+            if not page_token:  # 마지막 페이지면
+                return entries  # 반환
+
+    def _read(self, entry: LogEntry) -> bytes:  # Drive 파일 다운로드
+        from googleapiclient.http import MediaIoBaseDownload  # Drive 백엔드를 쓸 때만 로드
+
+        request = self.drive_service.files().get_media(fileId=entry.key)  # 다운로드 요청 생성
+        fh = BytesIO()  # 메모리 버퍼
+        downloader = MediaIoBaseDownload(fh, request)  # 다운로드 객체 생성
+        done = False  # 완료 여부
+        while not done:  # 완료될 때까지 반복
+            _, done = downloader.next_chunk()  # 다음 청크 다운로드
+        return fh.getvalue()  # bytes 반환
+
+    def _create(self, name: str, data: bytes) -> LogEntry:  # Drive에 새 파일 생성
+        from googleapiclient.http import MediaIoBaseUpload  # Drive 백엔드를 쓸 때만 로드
+
+        media = MediaIoBaseUpload(BytesIO(data), mimetype="application/json", resumable=False)  # 업로드 미디어 생성
+        metadata = {"name": name, "parents": [self.state_folder_id], "mimeType": "application/json"}  # 메타데이터
+        created = self.drive_service.files().create(  # 파일 생성
+            body=metadata, media_body=media, fields="id, version, modifiedTime"
+        ).execute()
+        return LogEntry(name=name, key=created["id"], version=f"{created.get('version', '')}:{created.get('modifiedTime', '')}")  # 엔트리 반환
+
+        media = MediaIoBaseUpload(BytesIO(data), mimetype="application/json", resumable=False)  # 업로드 미디어 생성
+        self.drive_service.files().update(fileId=entry.key, media_body=media).execute()  # 파일 내용 업데이트
+
+    def _delete(self, entry: LogEntry) -> None:  # Drive 파일 삭제
+        from googleapiclient.errors import HttpError  # Drive 백엔드를 쓸 때만 로드
+
+        try:
+            self.drive_service.files().delete(fileId=entry.key).execute()  # 삭제
+        except HttpError as e:
+            if e.resp.status != 404:  # 404: 다른 실행이 먼저 지움 → 성공으로 취급
+                raise
+
+
+@dataclass
+class LocalStateBackend(LogStateBackend):  # 로컬 디렉토리에 같은 구조로 저장(로컬 테스트용)
+    root: Path = Path(".state")  # state 파일들이 위치할 디렉토리
+
+    def _list_entries(self) -> List[LogEntry]:  # 디렉토리 목록
+        if not self.root.exists():  # 아직 없으면
+            return []  # 빈 목록
+        entries: List[LogEntry] = []  # 결과
+        for p in self.root.iterdir():  # 파일 순회
+            if p.name == self.state_file_name or (p.name.startswith((self.snapshot_prefix, self.delta_prefix)) and p.suffix == ".json"):  # 대상 파일만
+                entries.append(LogEntry(name=p.name, key=str(p), version=str(p.stat().st_mtime_ns)))  # mtime을 version으로 사용
+        return entries  # 반환
+
+    def _read(self, entry: LogEntry) -> bytes:  # 파일 읽기
+        return Path(entry.key).read_bytes()  # bytes 반환
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:  # 임시 파일에 쓰고 교체(중간 상태 노출 방지)
+        self.root.mkdir(parents=True, exist_ok=True)  # 디렉토리 보장
+        tmp = path.with_name(f".{path.name}.tmp")  # 임시 파일(목록 대상 아님)
+        tmp.write_bytes(data)  # 쓰기
+        tmp.replace(path)  # 원자적 교체
+
+    def _create(self, name: str, data: bytes) -> LogEntry:  # 새 파일 생성
+        path = self.root / name  # 경로
+        self._write_atomic(path, data)  # 쓰기
+        return LogEntry(name=name, key=str(path), version=str(path.stat().st_mtime_ns))  # 엔트리 반환
+
+    def _delete(self, entry: LogEntry) -> None:  # 파일 삭제
+        Path(entry.key).unlink(missing_ok=True)  # 이미 없으면 무시
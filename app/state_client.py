@@ -1,156 +1,129 @@
 from __future__ import annotations  # 타입 힌트 안정화
-import json  # state.json 직렬화/역직렬화
-import os  # 환경변수 읽기
-from dataclasses import dataclass  # 간단한 데이터 구조용
+from contextlib import contextmanager  # 트랜잭션 컨텍스트 매니저
+from dataclasses import dataclass, field  # 간단한 데이터 구조용
 from datetime import datetime, timezone  # 처리 시각 기록용(UTC)
-from io import BytesIO  # Drive 다운로드/업로드 버퍼
-from typing import Any, Dict, Optional  # 타입 힌트
+from pathlib import Path  # 로컬 state 경로
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple  # 타입 힌트
 
-from googleapiclient.discovery import build  # Drive API client 생성
-from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload  # 파일 다운로드/업로드
-from google.oauth2.credentials import Credentials  # OAuth 토큰 기반 인증
-from google.oauth2.service_account import Credentials as SACredentials  # 서비스계정 인증
-from google_auth_oauthlib.flow import InstalledAppFlow  # 로컬 OAuth 로그인 플로우
-from google.auth.transport.requests import Request  # 토큰 갱신 요청
+from app.drive_client import get_drive_service  # 공유 Drive service 팩토리
+from app.state_backends import DriveStateBackend, LocalStateBackend, LogStateBackend  # state 저장소 백엔드
 
 
-SCOPES = ["https://www.googleapis.com/auth/drive"]  # Drive 읽기/쓰기 권한(최소 필요 권한)
+@dataclass
+class StateTransaction:  # 처리 기록을 메모리에 모았다가 한 번에 커밋하는 트랜잭션
+    entries: List[Tuple[str, str]] = field(default_factory=list)  # (file_id, post_slug) 목록
+    added: int = 0  # 커밋 후: 실제로 새로 기록된 건수(이미 처리된 ID는 제외)
+
+    def mark(self, drive_file_id: str, post_slug: str) -> None:  # 처리 기록 추가(업로드는 커밋 때 1회)
+        self.entries.append((drive_file_id, post_slug))  # 메모리에만 추가
 
 
 @dataclass
-class StateClient:  # state.json을 Drive에서 관리하는 클라이언트
-    drive_service: Any  # google drive service 객체
-    state_folder_id: str  # state.json이 위치할 Drive 폴더 ID
-    state_file_name: str = "state.json"  # state 파일명 기본값
-    state_file_id: Optional[str] = None  # state.json의 Drive 파일 ID(찾아두면 캐시)
+class StateClient:  # 처리 기록(state)을 백엔드(Drive/로컬)에서 관리하는 클라이언트
+    backend: LogStateBackend  # 스냅샷 + append-only delta 저장소
+    compact_after: int = 20  # delta가 이 개수 이상 쌓이면 스냅샷으로 압축
+    _state: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False)  # 메모리에 올린 state 스냅샷
+    _index: Dict[str, Dict[str, Any]] = field(default_factory=dict, init=False, repr=False)  # file_id -> 처리 기록(O(1) 조회)
+    _snapshot_version: Optional[str] = field(default=None, init=False, repr=False)  # 스냅샷을 읽은 시점의 백엔드 토큰
 
     def _now_utc_iso(self) -> str:  # 현재 시간을 UTC ISO 문자열로 반환
         return datetime.now(timezone.utc).isoformat()  # 예: 2026-01-23T06:00:00+00:00
 
-    def _find_state_file_id(self) -> Optional[str]:  # 폴더 내 state.json 파일 ID를 찾는다
-        q = (  # Drive 검색 쿼리 문자열
-            f"'{self.state_folder_id}' in parents and "  # 특정 폴더 안에서
-            f"name = '{self.state_file_name}' and "  # 파일명이 state.json이고
-            "trashed = false"  # 휴지통이 아니면
-        )
-        resp = self.drive_service.files().list(q=q, fields="files(id, name)").execute()  # 파일 목록 조회
-        files = resp.get("files", [])  # 결과에서 files 추출
-        if not files:  # 없으면
-            return None  # None 반환
-        return files[0]["id"]  # 첫 번째 파일 ID 반환(동명이 파일 여러 개면 첫 번째 사용)
-
-    def _create_empty_state_file(self) -> str:  # 폴더에 state.json이 없으면 새로 만든다
-        empty_state = {"version": 1, "processed": []}  # 최소 state 구조
-        data = json.dumps(empty_state, ensure_ascii=False, indent=2).encode("utf-8")  # JSON bytes 생성
-
-        media = MediaIoBaseUpload(BytesIO(data), mimetype="application/json", resumable=False)  # 업로드 미디어 생성
-        metadata = {  # Drive 파일 메타데이터
-            "name": self.state_file_name,  # 파일명
-            "parents": [self.state_folder_id],  # 부모 폴더
-            "mimeType": "application/json",  # JSON 파일
-        }
-        created = self.drive_service.files().create(body=metadata, media_body=media, fields="id").execute()  # 파일 생성
-        return created["id"]  # 생성된 파일 ID 반환
-
-    def ensure_state_file(self) -> str:  # state.json 파일이 존재하도록 보장하고 file_id를 반환
-        if self.state_file_id:  # 이미 캐시되어 있으면
-            return self.state_file_id  # 그대로 반환
-        file_id = self._find_state_file_id()  # Drive에서 검색
-        if file_id is None:  # 없으면
-            file_id = self._create_empty_state_file()  # 새로 생성
-        self.state_file_id = file_id  # 캐시 저장
-        return file_id  # file_id 반환
-
-    def download_state(self) -> Dict[str, Any]:  # Drive에서 state.json 내려받아 dict로 반환
-        file_id = self.ensure_state_file()  # state.json file_id 확보
-        request = self.drive_service.files().get_media(fileId=file_id)  # 다운로드 요청 생성
-        fh = BytesIO()  # 메모리 버퍼
-        downloader = MediaIoBaseDownload(fh, request)  # 다운로드 객체 생성
-        done = False  # 완료 여부
-        while not done:  # 완료될 때까지 반복
-            _, done = downloader.next_chunk()  # 다음 청크 다운로드
-        content = fh.getvalue().decode("utf-8")  # bytes -> str
-        data = json.loads(content)  # JSON -> dict
-        if "processed" not in data or not isinstance(data["processed"], list):  # 필수 구조 검증
-            raise ValueError("Invalid state.json: missing 'processed' list")  # 구조가 이상하면 에러
-        data.setdefault("version", 1)  # version 없으면 기본 추가
-        return data  # state dict 반환
-
-    def upload_state(self, state: Dict[str, Any]) -> None:  # dict state를 Drive에 업로드(덮어쓰기)
-        file_id = self.ensure_state_file()  # state.json file_id 확보
-        data = json.dumps(state, ensure_ascii=False, indent=2).encode("utf-8")  # dict -> JSON bytes
-        media = MediaIoBaseUpload(BytesIO(data), mimetype="application/json", resumable=False)  # 업로드 미디어 생성
-        self.drive_service.files().update(fileId=file_id, media_body=media).execute()  # 파일 내용 업데이트
+    def download_state(self) -> Dict[str, Any]:  # 스냅샷 + delta를 합친 state dict 반환
+        return self.backend.load()[0]  # 합쳐진 state
+
+    def _set_snapshot(self, state: Dict[str, Any], version: Optional[str]) -> None:  # 스냅샷과 인덱스를 교체
+        self._state = state  # 스냅샷 저장
+        self._index = {item["file_id"]: item for item in state["processed"] if item.get("file_id")}  # file_id 해시 인덱스
+        self._snapshot_version = version  # 읽은 시점의 토큰 기록
+
+    def load_snapshot(self, force: bool = False) -> Dict[str, Any]:  # state를 한 번만 읽고, 백엔드가 바뀐 경우에만 다시 읽는다
+        version = self.backend.fingerprint()  # 목록 1회 조회(본문 다운로드 없음)
+        if force or self._state is None or version != self._snapshot_version:  # 처음이거나 바뀌었으면
+            state, version = self.backend.load()  # 새 delta만 추가로 다운로드
+            self._set_snapshot(state, version)  # 인덱스 재구성
+        return self._state  # 스냅샷 반환
+
+    def _ensure_index(self) -> Dict[str, Dict[str, Any]]:  # 스냅샷이 없을 때만 로드
+        if self._state is None:  # 아직 안 읽었으면
+            self.load_snapshot()  # 1회 로드
+        return self._index  # 인덱스 반환
 
     def is_processed(self, drive_file_id: str) -> bool:  # 특정 Drive 파일이 이미 처리됐는지 확인
-        state = self.download_state()  # state 다운로드
-        for item in state["processed"]:  # 처리 목록 순회
-            if item.get("file_id") == drive_file_id:  # file_id가 같으면
-                return True  # 이미 처리됨
-        return False  # 처리되지 않음
-
-    def mark_processed(self, drive_file_id: str, post_slug: str) -> None:  # 처리 완료 기록 추가 후 업로드
-        state = self.download_state()  # state 다운로드
-        if any(item.get("file_id") == drive_file_id for item in state["processed"]):  # 중복 방지
-            return  # 이미 있으면 아무 것도 안 함
-        state["processed"].append({  # 처리 기록 추가
-            "file_id": drive_file_id,  # Drive 파일 ID
-            "post_slug": post_slug,  # 생성된 포스트 slug
-            "processed_at": self._now_utc_iso(),  # 처리 시각(UTC)
-        })
-        self.upload_state(state)  # 업로드(저장)
-
-
-def _build_drive_service() -> Any:  # Drive API service 객체를 만든다(서비스계정 or OAuth)
-    sa_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")  # 서비스계정 키 JSON 경로(환경변수)
-    if sa_path and os.path.exists(sa_path):  # 서비스계정 키가 있으면
-        creds = SACredentials.from_service_account_file(sa_path, scopes=SCOPES)  # 서비스계정 creds 생성
-        return build("drive", "v3", credentials=creds)  # drive service 생성
-
-    # ✅ repo 루트 기준으로 경로를 고정 (작업 디렉토리(os.getcwd())에 영향 안 받게)
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))  # .../hyun/app -> .../hyun
-
-    # ✅ token은 루트에 저장(추적 금지), client_secret은 루트 또는 secret 폴더 허용
-    token_path = os.path.join(base_dir, "token.json")
-    client_secret_candidates = [
-        os.path.join(base_dir, "client_secret.json"),
-        os.path.join(base_dir, "secrets", "client_secret.json"),
-    ]
-    client_secret_path = next((p for p in client_secret_candidates if os.path.exists(p)), None)
-
-    creds: Optional[Credentials] = None  # creds 초기화
-
-    if os.path.exists(token_path):  # token.json이 있으면
-        creds = Credentials.from_authorized_user_file(token_path, SCOPES)  # token으로 creds 생성
-
-    if not creds or not creds.valid:  # creds가 없거나 유효하지 않으면
-        if creds and creds.expired and creds.refresh_token:  # 만료됐고 refresh_token 있으면
-            creds.refresh(Request())  # 토큰 갱신
-        else:  # 처음 로그인 필요
-            if not client_secret_path:  # client_secret.json이 없으면
-                raise FileNotFoundError(
-                    "Missing OAuth client secret file. Checked:\n"
-                    f"- {client_secret_candidates[0]}\n"
-                    f"- {client_secret_candidates[1]}\n"
-                    "Or set GOOGLE_APPLICATION_CREDENTIALS for service account."
-                )
-            flow = InstalledAppFlow.from_client_secrets_file(client_secret_path, SCOPES)  # 로컬 로그인 플로우 준비
-            creds = flow.run_local_server(port=0)  # 브라우저 열어서 로그인(자동)
-
-        with open(token_path, "w", encoding="utf-8") as f:  # 갱신/발급된 토큰 저장
-            f.write(creds.to_json())  # token.json 생성/업데이트
-
-    return build("drive", "v3", credentials=creds)  # drive service 생성
-
-
-def create_state_client(config: Dict[str, Any]) -> StateClient:  # config로 StateClient 생성
+        return drive_file_id in self._ensure_index()  # 메모리 인덱스로 O(1) 조회
+
+    def filter_unprocessed(self, drive_file_ids: Iterable[str]) -> List[str]:  # 처리되지 않은 ID만 순서 유지해서 반환
+        self.load_snapshot()  # 실행마다 한 번 변경 확인(바뀌었을 때만 재다운로드)
+        index = self._index  # 인덱스 참조
+        return [fid for fid in drive_file_ids if fid not in index]  # 미처리 ID 목록
+
+    def mark_processed(self, drive_file_id: str, post_slug: str) -> None:  # 처리 완료 기록 추가 후 저장
+        self.mark_processed_many([(drive_file_id, post_slug)])  # 1건짜리 배치로 처리
+
+    def mark_processed_many(self, entries: Iterable[Tuple[str, str]]) -> int:  # 여러 건을 delta 파일 1개로 기록
+        index = self._ensure_index()  # 현재 인덱스
+        processed_at = self._now_utc_iso()  # 이번 커밋의 처리 시각
+        new_items: List[Dict[str, Any]] = []  # 실제로 추가할 기록
+        seen = set(index)  # 중복 방지용(이번 배치 내부 중복 포함)
+        for drive_file_id, post_slug in entries:  # 배치 순회
+            if drive_file_id in seen:  # 이미 있으면
+                continue  # 건너뜀
+            seen.add(drive_file_id)  # 중복 방지
+            new_items.append({  # 처리 기록 추가
+                "file_id": drive_file_id,  # Drive 파일 ID
+                "post_slug": post_slug,  # 생성된 포스트 slug
+                "processed_at": processed_at,  # 처리 시각(UTC)
+            })
+        if not new_items:  # 전부 이미 처리됨
+            return 0  # 저장 생략
+        self.backend.append(new_items)  # 새 파일 1개 생성(덮어쓰기가 없어 동시 실행끼리 충돌하지 않음)
+        for item in new_items:  # 메모리 인덱스에도 반영
+            self._index[item["file_id"]] = item  # O(1) 추가
+        self._state["processed"].extend(new_items)  # 스냅샷에도 반영
+        self._snapshot_version = None  # 다음 filter_unprocessed에서 토큰 갱신(새 delta는 캐시에서 읽음)
+        self.maybe_compact()  # 필요하면 압축
+        return len(new_items)  # 추가된 건수
+
+    def maybe_compact(self) -> bool:  # delta가 충분히 쌓였으면 스냅샷으로 압축
+        try:
+            if self.compact_after <= 0 or self.backend.delta_count() < self.compact_after:  # 기준 미달이면
+                return False  # 생략
+            return self.backend.compact()  # 압축(합칠 게 없으면 False)
+        except Exception as e:  # 압축은 최적화일 뿐 → 이미 기록된 delta를 실패로 만들지 않음(다음 실행에서 다시 시도)
+            print(f"[WARN] State compaction failed: {type(e).__name__}: {e}")
+            return False
+
+    @contextmanager
+    def transaction(self) -> Iterator[StateTransaction]:  # with 블록이 정상 종료될 때 한 번에 커밋
+        tx = StateTransaction()  # 빈 트랜잭션
+        yield tx  # 호출 측에서 tx.mark(...)로 기록
+        tx.added = self.mark_processed_many(tx.entries)  # 예외 없이 끝나면 1회 저장
+
+
+_build_drive_service = get_drive_service  # 기존 함수명 호환 (공유 Drive service 반환)
+
+
+def create_state_client(config: Dict[str, Any], drive_service: Any = None) -> StateClient:  # config로 StateClient 생성
     drive_cfg = config.get("drive", {})  # config.drive 섹션 가져오기
-    folder_id = drive_cfg.get("state_folder_id")  # state_folder_id 읽기
-    if not folder_id:  # 없으면
-        raise ValueError("config.drive.state_folder_id is required")  # 명확히 에러
+    state_cfg = config.get("state", {})  # config.state 섹션 가져오기
     file_name = drive_cfg.get("state_file_name", "state.json")  # 파일명 기본 state.json
-    service = _build_drive_service()  # Drive service 생성
-    return StateClient(drive_service=service, state_folder_id=folder_id, state_file_name=file_name)  # 객체 반환
+    compact_after = int(state_cfg.get("compact_after", 20))  # 압축 기준 delta 개수
+    backend_name = state_cfg.get("backend", "drive")  # drive | local
+
+    if backend_name == "local":  # 로컬 디렉토리 백엔드(Drive 불필요)
+        base_dir = Path(__file__).resolve().parent.parent  # repo 루트
+        root = base_dir / state_cfg.get("local_dir", ".state")  # state 디렉토리
+        backend: LogStateBackend = LocalStateBackend(state_file_name=file_name, root=root)  # 로컬 백엔드
+    elif backend_name == "drive":  # Drive 폴더 백엔드
+        folder_id = drive_cfg.get("state_folder_id")  # state_folder_id 읽기
+        if not folder_id:  # 없으면
+            raise ValueError("config.drive.state_folder_id is required")  # 명확히 에러
+        service = drive_service or get_drive_service()  # 공유 Drive service(없으면 한 번만 생성)
+        backend = DriveStateBackend(state_file_name=file_name, drive_service=service, state_folder_id=folder_id)  # Drive 백엔드
+    else:  # 알 수 없는 값
+        raise ValueError(f"config.state.backend must be 'drive' or 'local' (got {backend_name})")  # 명확히 에러
+
+    return StateClient(backend=backend, compact_after=compact_after)  # 객체 반환
 
 
 if __name__ == "__main__":  # 단독 실행 테스트용
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import random
+import signal
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.pipeline import Pipeline, PipelineResult
+
+
+@dataclass
+class Watcher:
+    """프로세스를 띄워 둔 채 Drive changes API로 입력 폴더를 감시하고, 새 이미지가 오면 파이프라인 1회 실행
+
+    Drive/Gemini 클라이언트, 토큰, 설정, state 스냅샷은 Pipeline 객체 하나를 계속 재사용한다.
+    """
+
+    pipeline: Pipeline
+    interval_seconds: float = 60.0
+    jitter_seconds: float = 10.0  # 여러 인스턴스/요청이 같은 순간에 몰리지 않도록
+    max_backoff_seconds: float = 900.0  # 실행이 연달아 실패하면 재시도 간격을 늘림(상한)
+    drain: bool = True
+    max_posts: Optional[int] = None  # None이면 pipeline.drain 설정
+    max_seconds: Optional[float] = None
+    _stop: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+
+    def _log(self, level: str, msg: str) -> None:
+        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{ts}] [{level}] [watch] {msg}")
+
+    def stop(self, *_: Any) -> None:
+        """SIGTERM/SIGINT: 진행 중인 실행은 끝까지 마치고 종료"""
+        if not self._stop.is_set():
+            self._log("INFO", "Shutdown requested; finishing the current cycle...")
+        self._stop.set()
+
+    def _install_signal_handlers(self) -> None:
+        if threading.current_thread() is not threading.main_thread():
+            return
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    def _run_cycle(self) -> PipelineResult:
+        try:
+            if self.drain:
+                return self.pipeline.run_drain(max_posts=self.max_posts, max_seconds=self.max_seconds)
+            return self.pipeline.run()
+        except Exception as e:  # 상주 프로세스는 한 번의 실패로 죽지 않게
+            err_msg = f"{type(e).__name__}: {e}"
+            return PipelineResult(ok=False, message="Pipeline failed.", errors=[err_msg])
+
+    def _sleep(self, failures: int) -> None:
+        delay = self.interval_seconds
+        if failures:
+            delay = min(self.max_backoff_seconds, self.interval_seconds * (2 ** failures))
+        self._stop.wait(max(0.0, delay + random.uniform(0.0, self.jitter_seconds)))
+
+    def run_forever(self) -> Dict[str, int]:
+        """stop()될 때까지 감시. 실행 횟수/발행 글 수 요약 반환"""
+        self._install_signal_handlers()
+        drive = self.pipeline.drive_manager
+        stats = {"polls": 0, "cycles": 0, "posts": 0, "failures": 0}
+
+        page_token = drive.start_page_token()  # 커서를 먼저 받고 시작 → 첫 실행 중에 올라온 파일도 다음 poll에서 잡힘
+        pending = True  # 시작할 때 밀린 이미지부터 처리
+        failures = 0
+        self._log("INFO", f"Watching Drive folder {drive.input_folder_id} every ~{self.interval_seconds:.0f}s")
+
+        while not self._stop.is_set():
+            if not pending:
+                try:
+                    stats["polls"] += 1
+                    pending, page_token = drive.poll_changes(page_token)
+                except Exception as e:
+                    failures += 1
+                    self._log("ERROR", f"Drive changes poll failed: {type(e).__name__}: {e}")
+                    self._sleep(failures)
+                    continue
+                if pending:
+                    self._log("INFO", "New images detected")
+
+            if pending:
+                stats["cycles"] += 1
+                result = self._run_cycle()
+                stats["posts"] += len(result.post_slugs or ([result.post_slug] if result.post_slug else []))
+                if result.ok:
+                    failures = 0
+                    # 글을 만들었으면 예산 때문에 남은 배치가 있을 수 있으니 다음 주기에 한 번 더 확인
+                    pending = result.processed_count > 0
+                else:
+                    failures += 1
+                    stats["failures"] += 1
+                    pending = True  # 실패한 실행은 체크포인트에서 이어서 재시도
+                    self._log("WARN", f"Cycle failed ({failures} in a row): {result.errors}")
+
+            self._sleep(failures)
+
+        self._log("INFO", f"Stopped: {stats}")
+        return stats
+
+
+def create_watcher(config: Dict[str, Any], pipeline: Optional[Pipeline] = None) -> Watcher:
+    watch_cfg = config.get("watch", {})
+    return Watcher(
+        pipeline=pipeline or Pipeline(config),
+        interval_seconds=float(watch_cfg.get("interval_seconds", 60)),
+        jitter_seconds=float(watch_cfg.get("jitter_seconds", 10)),
+        max_backoff_seconds=float(watch_cfg.get("max_backoff_seconds", 900)),
+        drain=bool(watch_cfg.get("drain", True)),
+    )